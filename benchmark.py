@@ -0,0 +1,734 @@
+"""
+Synthetic-fleet benchmarks for the Plato generation pipeline.
+
+Plato runs against a fake Docker client serving a generated fleet of
+labelled containers and a generated nginx tree, without touching /www or
+a Docker daemon. Results are printed as JSON so runs of different
+versions can be compared:
+
+    python3 benchmark.py --sizes 100 1000 10000 --output new.json
+    python3 benchmark.py --compare old.json new.json
+    python3 benchmark.py --check
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+import yaml
+
+REPO_PATH = Path(__file__).resolve().parent
+
+# Imported by setup_plato() once the sandboxed www root exists
+plato = None
+
+# ===================================================
+#                  SYNTHETIC FLEET
+# ===================================================
+
+CATEGORIES = ["Media", "Download", "Utilities", "Infrastructure", "Monitoring", "Home", "Network", "Dev"]
+
+IMAGES = [
+    "lscr.io/linuxserver/jellyfin:latest",
+    "lscr.io/linuxserver/sonarr:latest",
+    "lscr.io/linuxserver/radarr:latest",
+    "lscr.io/linuxserver/qbittorrent:latest",
+    "ghcr.io/home-assistant/home-assistant:stable",
+    "grafana/grafana:latest",
+    "prom/prometheus:latest",
+    "portainer/portainer-ce:latest",
+    "nextcloud:29",
+    "gitea/gitea:1.22",
+]
+
+# Images without published ports resolved through KNOWN_PORTS
+KNOWN_PORT_IMAGES = [
+    "lscr.io/linuxserver/jellyfin:latest",
+    "ghcr.io/home-assistant/home-assistant:stable",
+    "ghcr.io/esphome/esphome:latest",
+]
+
+
+def _port(private: int, public: int) -> List[dict]:
+    # Docker lists every published port once per address family
+    return [
+        {"IP": "0.0.0.0", "PrivatePort": private, "PublicPort": public, "Type": "tcp"},
+        {"IP": "::", "PrivatePort": private, "PublicPort": public, "Type": "tcp"},
+    ]
+
+
+def _image_id(image: str) -> str:
+    return "sha256:" + hashlib.sha256(image.encode()).hexdigest()
+
+
+def make_fleet(size: int, seed: int = 0) -> List[dict]:
+    """Container list entries for size Plato containers plus unlabelled and stopped noise"""
+    rng = random.Random(seed)
+    fleet = []
+
+    for i in range(size):
+        name = f"svc-{i}"
+        public = 20000 + i
+        labels = {
+            "plato.category": rng.choice(CATEGORIES),
+            "com.docker.compose.project": f"stack{i % 40}",
+        }
+        image = rng.choice(IMAGES)
+        ports = []
+
+        kind = rng.random()
+        if kind < 0.60:
+            ports = _port(rng.choice([80, 3000, 8080, 8096, 9000]), public)
+        elif kind < 0.75:
+            # Multiple ports, disambiguated by a common HTTP port
+            ports = _port(8080, public) + _port(9100, public + 30000) + [{"PrivatePort": 53, "PublicPort": public, "Type": "udp"}]
+        elif kind < 0.85:
+            ports = _port(8080, public) + _port(8443, public + 30000)
+            labels["plato.ui-port"] = str(public)
+        elif kind < 0.90:
+            labels["caddy"] = f"{name}.example.com"
+        elif kind < 0.95:
+            labels["plato.url"] = f"https://{name}.example.com"
+        else:
+            image = rng.choice(KNOWN_PORT_IMAGES)
+
+        if rng.random() < 0.5:
+            labels["plato.name"] = name.replace("-", " ").title()
+        if rng.random() < 0.3:
+            labels["plato.subtitle"] = f"Service {i}"
+            labels["plato.tag"] = "app"
+        if rng.random() < 0.2:
+            labels["plato.position"] = str(rng.randint(1, 20))
+        if rng.random() < 0.1:
+            labels["plato.selfhst-icon"] = "grafana"
+
+        fleet.append({
+            "Id": f"{i:064x}",
+            "Names": [f"/{name}"],
+            "Image": image,
+            "ImageID": _image_id(image),
+            "Labels": labels,
+            "State": "running",
+            "Ports": ports,
+        })
+
+    # Containers that server-side filters must keep away from Plato
+    for i in range(size):
+        fleet.append({
+            "Id": f"{size + i:064x}",
+            "Names": [f"/other-{i}"],
+            "Image": "alpine:latest",
+            "ImageID": _image_id("alpine:latest"),
+            "Labels": {} if i % 2 else {"plato.category": "Media"},
+            "State": "running" if i % 2 else "exited",
+            "Ports": [],
+        })
+
+    return fleet
+
+
+def make_event_storm(fleet: List[dict], restarts: int, seed: int = 0) -> List[dict]:
+    """Restart events for random Plato containers, with the noise Docker sends around them"""
+    rng = random.Random(seed)
+    labelled = [c for c in fleet if c["State"] == "running" and "plato.category" in c["Labels"]]
+    events = []
+
+    for container in rng.sample(labelled, min(restarts, len(labelled))):
+        attributes = dict(container["Labels"], name=container["Names"][0].lstrip("/"), image=container["Image"])
+        for action in ("kill", "die", "stop", "create", "attach", "start", "resize", "exec_start: sh", "health_status: healthy"):
+            events.append({"Type": "container", "Action": action, "Actor": {"ID": container["Id"], "Attributes": attributes}})
+
+    return events
+
+# ===================================================
+#                  FAKE DOCKER CLIENT
+# ===================================================
+
+class FakeEventStream:
+    def __init__(self, events: List[dict]):
+        self._events = iter(events)
+        self.last_event = None
+        self.exhausted = False
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
+        try:
+            event = next(self._events)
+        except StopIteration:
+            self.exhausted = True
+            # Like a live daemon: block until closed
+            while not self._closed:
+                time.sleep(0.01)
+            raise
+        self.last_event = time.perf_counter()
+        return event
+
+    def close(self):
+        self._closed = True
+
+
+class FakeAPI:
+    def __init__(self, client: "FakeDockerClient"):
+        self._client = client
+
+    def containers(self, all=False, filters=None):
+        self._client.calls += 1
+        filters = filters or {}
+        result = []
+        for container in self._client.fleet:
+            if "id" in filters and container["Id"] != filters["id"]:
+                continue
+            if "label" in filters and filters["label"] not in container["Labels"]:
+                continue
+            if "status" in filters and container["State"] != filters["status"]:
+                continue
+            if not all and "status" not in filters and container["State"] != "running":
+                continue
+            result.append(container)
+        return result
+
+    def inspect_image(self, image_id):
+        self._client.calls += 1
+        image = self._client.images[image_id]
+        return {
+            "Id": image_id,
+            "Config": {
+                "ExposedPorts": {"8080/tcp": {}, "53/udp": {}},
+                "Labels": {"org.opencontainers.image.title": image.rsplit("/", 1)[-1].split(":")[0]},
+            },
+        }
+
+
+class FakeDockerClient:
+    """The subset of docker.DockerClient used by Plato, serving a synthetic fleet"""
+
+    def __init__(self, fleet: List[dict], events: List[dict] = ()):
+        self.fleet = fleet
+        self.images = {container["ImageID"]: container["Image"] for container in fleet}
+        self.events_list = list(events)
+        self.calls = 0
+        self.api = FakeAPI(self)
+        self.stream = None
+
+    def events(self, decode=True, filters=None):
+        self.calls += 1
+        allowed = set((filters or {}).get("event", []))
+        label = (filters or {}).get("label")
+        self.stream = FakeEventStream([
+            event for event in self.events_list
+            if (not allowed or event["Action"] in allowed)
+            and (not label or label in event["Actor"]["Attributes"])
+        ])
+        return self.stream
+
+# ===================================================
+#                  NGINX TREE
+# ===================================================
+
+def make_nginx_tree(root: Path, fleet: List[dict]) -> Path:
+    sites = root / "sites-enabled"
+    sites.mkdir(parents=True)
+
+    nginx_conf = root / "nginx.conf"
+    nginx_conf.write_text("events {}\nhttp {\n    include sites-enabled/*;\n}\n")
+
+    for container in fleet:
+        if "plato.category" not in container["Labels"] or container["State"] != "running":
+            continue
+        for port in container["Ports"][:1]:
+            name = container["Names"][0].lstrip("/")
+            (sites / name).write_text(
+                "server {\n"
+                "    listen 443 ssl;\n"
+                f"    server_name {name}.example.com;\n"
+                "    location / {\n"
+                f"        proxy_pass http://127.0.0.1:{port['PublicPort']};\n"
+                "    }\n"
+                "}\n"
+            )
+
+    return nginx_conf
+
+# ===================================================
+#                  MEASUREMENTS
+# ===================================================
+
+def timed(func, repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(samples), "max_s": max(samples), "runs": repeat}
+
+
+def bench_stages(size: int, repeat: int, work: Path) -> Dict[str, dict]:
+    fleet = make_fleet(size)
+    client = FakeDockerClient(fleet)
+    nginx_conf = make_nginx_tree(work / f"nginx-{size}", fleet)
+
+    host = plato.DockerHost(plato.HOSTNAME)
+    host.client = client
+    plato.docker_hosts = [host]
+
+    stages = {}
+
+    def nginx_cold():
+        plato._nginx_parse_cache = plato.NginxParseCache()
+        plato.route_index.set_nginx_routes(plato.get_nginx_routes(nginx_conf))
+
+    stages["nginx_parse_cold"] = timed(nginx_cold, repeat)
+
+    site = next((nginx_conf.parent / "sites-enabled").iterdir())
+    def nginx_one_changed():
+        site.write_text(site.read_text() + "\n")
+        plato.route_index.set_nginx_routes(plato.get_nginx_routes(nginx_conf))
+
+    stages["nginx_parse_one_changed"] = timed(nginx_one_changed, repeat)
+
+    client.calls = 0
+    stages["container_list"] = timed(host.load, repeat)
+    stages["container_list"]["api_calls"] = client.calls / repeat
+
+    records = host.store.records()
+    local = [r for r in records if not {"plato.url", "plato.ui-port", "caddy"} & r.labels.keys()]
+    stages["local_url"] = timed(lambda: [plato.get_local_url(r, r.name, host.hostname) for r in local], repeat)
+
+    stages["icon_lookup"] = timed(lambda: [plato.icon_index.lookup(r.name) or plato.icon_index.lookup_image(r.image) for r in records], repeat)
+
+    rendered = []
+    stages["render"] = timed(lambda: rendered.append(plato.render_homer_config()), repeat)
+
+    writes = itertools.count()
+    stages["publish_changed"] = timed(lambda: plato.publish_config({path: text + f"# {next(writes)}\n" for path, text in rendered[-1].items()}), repeat)
+    stages["publish_unchanged"] = timed(lambda: plato.publish_config(rendered[-1]), repeat)
+
+    return stages
+
+
+def bench_peak_memory(size: int) -> int:
+    """Peak Python heap while loading the fleet and rendering the config"""
+    client = FakeDockerClient(make_fleet(size))
+    host = plato.DockerHost(plato.HOSTNAME)
+    host.client = client
+    plato.docker_hosts = [host]
+
+    tracemalloc.start()
+    try:
+        host.load()
+        plato.render_homer_config()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def _run_storm(client: FakeDockerClient, publish_times: List[float]):
+    scheduler = plato.RegenerationScheduler(quiet_window=0.05, max_latency=0.5)
+    host = plato.DockerHost(plato.HOSTNAME)
+    host.client = client
+    plato.docker_hosts = [host]
+
+    async with asyncio.TaskGroup() as tasks:
+        runtime = [
+            tasks.create_task(scheduler.regenerate()),
+            tasks.create_task(scheduler.publish()),
+            tasks.create_task(host.watch(scheduler.request)),
+        ]
+
+        # Wait for the storm to be drained and published
+        while True:
+            await asyncio.sleep(0.01)
+            stream = client.stream
+            if stream and stream.exhausted and publish_times and publish_times[-1] > stream.last_event:
+                break
+
+        for task in runtime:
+            task.cancel()
+
+
+def bench_event_storm(size: int, restarts: int) -> dict:
+    fleet = make_fleet(size)
+    storm = make_event_storm(fleet, restarts)
+    client = FakeDockerClient(fleet, storm)
+
+    publish_times: List[float] = []
+    publish_config = plato.publish_config
+    def timed_publish(files):
+        written = publish_config(files)
+        publish_times.append(time.perf_counter())
+        return written
+
+    plato.publish_config = timed_publish
+    try:
+        start = time.perf_counter()
+        asyncio.run(_run_storm(client, publish_times))
+    finally:
+        plato.publish_config = publish_config
+
+    stream = client.stream
+    # Subscription and initial listing are not caused by the storm
+    api_calls = client.calls - 2
+
+    return {
+        "events": len(storm),
+        "restarts": restarts,
+        "event_to_publish_s": next(t for t in publish_times if t > stream.last_event) - stream.last_event,
+        "storm_total_s": publish_times[-1] - start,
+        "publishes": len(publish_times),
+        "api_calls_per_event": api_calls / len(storm) if storm else 0,
+    }
+
+# ===================================================
+#                  HEALTH PROBES
+# ===================================================
+
+async def _check_probes(services: int, concurrency: int, timeout: float) -> dict:
+    """Probe local stub servers that answer, fail, hang or refuse, and check what the prober reports"""
+    hits: Dict[str, int] = {}
+    in_flight = peak = 0
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            path = (await reader.readline()).split()[1].decode()
+            hits[path] = hits.get(path, 0) + 1
+            if path.startswith("/hang"):
+                # Until the prober gives up and hangs up
+                await reader.read()
+                return
+            # Held open so that probes overlap
+            await asyncio.sleep(0.02)
+            status = "503 Service Unavailable" if path.startswith("/error") else "200 OK"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\n\r\n".encode())
+            await writer.drain()
+        finally:
+            in_flight -= 1
+            writer.close()
+
+    server = await asyncio.start_server(handle, host="127.0.0.1", port=0)
+    port = server.sockets[0].getsockname()[1]
+    # Nothing listens on a port that was just released
+    closed = await asyncio.start_server(handle, host="127.0.0.1", port=0)
+    closed_port = closed.sockets[0].getsockname()[1]
+    closed.close()
+    await closed.wait_closed()
+
+    base = f"http://127.0.0.1:{port}"
+    targets = {f"{base}/ok/{i}": 60.0 for i in range(services)}
+    targets.update({f"{base}/error": 60.0, f"{base}/hang": 60.0, f"http://127.0.0.1:{closed_port}/": 60.0, f"{base}/eager": 0.0})
+
+    async with server:
+        prober = plato.ServiceProber(timeout=timeout, concurrency=concurrency)
+        start = time.perf_counter()
+        await prober.probe_due(targets)
+        duration = time.perf_counter() - start
+        first = prober.results()
+        # Only the service with no interval is due again
+        await prober.probe_due(targets)
+
+    expected = {url: "online" for url in targets}
+    expected.update({f"{base}/error": "offline", f"{base}/hang": "offline", f"http://127.0.0.1:{closed_port}/": "offline"})
+
+    failed = [f"{url} reported {first[url]['status']}" for url, status in expected.items() if first[url]["status"] != status]
+    if first[f"{base}/error"]["code"] != 503:
+        failed.append("5xx answer not reported with its code")
+    if first[f"{base}/hang"]["latency_ms"] > timeout * 2000:
+        failed.append("hanging service not timed out")
+    if peak > concurrency:
+        failed.append(f"{peak} probes in flight, limit is {concurrency}")
+    reprobed = sorted(path for path, count in hits.items() if count > 1)
+    if reprobed != ["/eager"]:
+        failed.append(f"probed again before their interval: {reprobed}")
+
+    return {
+        "services": len(targets),
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "peak_in_flight": peak,
+        "failed_checks": failed,
+    }
+
+
+def check_probes(services: int = 60, concurrency: int = 8, timeout: float = 0.2) -> dict:
+    return asyncio.run(_check_probes(services, concurrency, timeout))
+
+# ===================================================
+#                  MULTIPLE HOSTS
+# ===================================================
+
+class HungDockerClient(FakeDockerClient):
+    """A daemon that accepts the connection but never answers the event subscription"""
+
+    def __init__(self, fleet: List[dict]):
+        super().__init__(fleet)
+        self.released = threading.Event()
+
+    def events(self, decode=True, filters=None):
+        self.calls += 1
+        self.released.wait()
+        return FakeEventStream([])
+
+
+class FailingAPI(FakeAPI):
+    def containers(self, all=False, filters=None):
+        self._client.calls += 1
+        raise ConnectionError("Connection reset by peer")
+
+
+class FailingDockerClient(FakeDockerClient):
+    """A daemon whose event stream opens but whose container list fails"""
+
+    def __init__(self, fleet: List[dict]):
+        super().__init__(fleet)
+        self.api = FailingAPI(self)
+
+
+def make_host_fleet(hostname: str, size: int, first_port: int) -> List[dict]:
+    """size containers named after their host, each publishing one port"""
+    image = IMAGES[0]
+    return [
+        {
+            "Id": hashlib.sha256(f"{hostname}-{i}".encode()).hexdigest(),
+            "Names": [f"/{hostname}-{i}"],
+            "Image": image,
+            "ImageID": _image_id(image),
+            "Labels": {"plato.category": "Media"},
+            "State": "running",
+            "Ports": _port(3000, first_port + i),
+        }
+        for i in range(size)
+    ]
+
+
+def _published_services(files: Dict[Path, str]) -> Dict[str, str]:
+    """Service name -> URL in the published dashboard"""
+    services = {}
+    for text in files.values():
+        for group in yaml.safe_load(text).get("services") or []:
+            for item in group.get("items") or []:
+                services[item["name"]] = item["url"]
+    return services
+
+
+async def _check_hosts(timeout: float) -> dict:
+    """Watch healthy, hanging and failing hosts together and check what gets published"""
+    alpha = FakeDockerClient(make_host_fleet("alpha", 4, 21000))
+    # Removed by an event once alpha is loaded
+    gone = alpha.fleet[-1]
+    alpha.events_list = [{
+        "Type": "container",
+        "Action": "destroy",
+        "Actor": {"ID": gone["Id"], "Attributes": dict(gone["Labels"], name=gone["Names"][0].lstrip("/"))},
+    }]
+    clients = {
+        "alpha": alpha,
+        "beta": FakeDockerClient(make_host_fleet("beta", 2, 22000)),
+        "hung": HungDockerClient(make_host_fleet("hung", 2, 23000)),
+        "failing": FailingDockerClient(make_host_fleet("failing", 2, 24000)),
+    }
+    expected = {"Alpha-0": "alpha", "Alpha-1": "alpha", "Alpha-2": "alpha", "Beta-0": "beta", "Beta-1": "beta"}
+
+    hosts = []
+    for hostname, client in clients.items():
+        host = plato.DockerHost(hostname)
+        host.client = client
+        hosts.append(host)
+    plato.docker_hosts = hosts
+
+    published: List[Dict[str, str]] = []
+    publish_config = plato.publish_config
+    def recording_publish(files):
+        published.append(_published_services(files))
+        return publish_config(files)
+
+    scheduler = plato.RegenerationScheduler(quiet_window=0.05, max_latency=0.5)
+    plato.publish_config = recording_publish
+    start = time.perf_counter()
+    try:
+        async with asyncio.TaskGroup() as tasks:
+            runtime = [
+                tasks.create_task(scheduler.regenerate()),
+                tasks.create_task(scheduler.publish()),
+            ] + [tasks.create_task(host.watch(scheduler.request)) for host in hosts]
+
+            while time.perf_counter() - start < timeout:
+                await asyncio.sleep(0.01)
+                if published and published[-1].keys() == expected.keys():
+                    break
+            duration = time.perf_counter() - start
+
+            for task in runtime:
+                task.cancel()
+    finally:
+        plato.publish_config = publish_config
+        clients["hung"].released.set()
+
+    services = published[-1] if published else {}
+    failed = []
+    if services.keys() != expected.keys():
+        failed.append(f"published {sorted(services)}, expected {sorted(expected)}")
+    for name, url in services.items():
+        hostname = expected.get(name)
+        if hostname and not url.startswith(f"http://{hostname}:"):
+            failed.append(f"{name} published as {url}, not on {hostname}")
+
+    return {
+        "hosts": len(hosts),
+        "publishes": len(published),
+        "published_s": duration,
+        "failed_checks": failed,
+    }
+
+
+def check_hosts(timeout: float = 5.0) -> dict:
+    # Routes left behind by the fleet benchmark would rewrite the URLs
+    route_index = plato.route_index
+    plato.route_index = plato.RouteIndex()
+    try:
+        return asyncio.run(_check_hosts(timeout))
+    finally:
+        plato.route_index = route_index
+
+# ===================================================
+#                  SETUP / REPORT
+# ===================================================
+
+def setup_plato(work: Path):
+    """Import plato against a sandboxed www root"""
+    global plato
+
+    www = work / "www"
+    shutil.copytree(REPO_PATH / "themes", www / "themes")
+    icons = www / "assets" / "selfhst-icons" / "png"
+    icons.mkdir(parents=True)
+    (www / "assets" / "custom").mkdir()
+    for image in IMAGES + KNOWN_PORT_IMAGES:
+        (icons / f"{image.rsplit('/', 1)[-1].split(':')[0]}.png").write_bytes(b"")
+
+    os.environ["WWW_PATH"] = str(www)
+    # Never warm start a real Plato from benchmark data
+    os.environ["STATE_PATH"] = ""
+    os.environ.setdefault("HOSTNAME", "bench")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    sys.path.insert(0, str(REPO_PATH))
+    plato = importlib.import_module("plato")
+    plato.icon_index.load()
+
+
+def git_version() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=REPO_PATH, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old_path: Path, new_path: Path, threshold: float) -> int:
+    old = json.loads(old_path.read_text())
+    new = json.loads(new_path.read_text())
+    regressions = 0
+
+    print(f"{old['version']} -> {new['version']}")
+    for size, result in new["fleets"].items():
+        baseline = old["fleets"].get(size)
+        if not baseline:
+            continue
+
+        pairs = [
+            (stage, baseline["stages"][stage]["median_s"], values["median_s"])
+            for stage, values in result["stages"].items()
+            if stage in baseline["stages"]
+        ]
+        pairs.append(("event_to_publish", baseline["event_storm"]["event_to_publish_s"], result["event_storm"]["event_to_publish_s"]))
+        pairs.append(("peak_memory", baseline["peak_memory_bytes"], result["peak_memory_bytes"]))
+
+        for stage, before, after in pairs:
+            ratio = after / before if before else float("inf")
+            flag = ""
+            if ratio > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"  {size:>6} {stage:<24} {before:>14.6g} -> {after:<14.6g} x{ratio:.2f}{flag}")
+
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="fleet sizes to benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage")
+    parser.add_argument("--restarts", type=int, default=40, help="containers restarted by the event storm")
+    parser.add_argument("--output", type=Path, help="write the JSON results here instead of stdout")
+    parser.add_argument("--compare", type=Path, nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    parser.add_argument("--check", action="store_true", help="only run the checks, not the fleet benchmarks")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    with tempfile.TemporaryDirectory(prefix="plato-bench-") as tmp:
+        work = Path(tmp)
+        setup_plato(work)
+
+        results = {
+            "version": git_version(),
+            "python": platform.python_version(),
+            "fleets": {},
+        }
+        for size in [] if args.check else args.sizes:
+            print(f"Benchmarking {size} containers", file=sys.stderr)
+            results["fleets"][str(size)] = {
+                "stages": bench_stages(size, args.repeat, work),
+                "event_storm": bench_event_storm(size, args.restarts),
+                "peak_memory_bytes": bench_peak_memory(size),
+            }
+
+        print("Watching hanging and failing hosts", file=sys.stderr)
+        results["hosts"] = check_hosts()
+
+        print("Probing stub services", file=sys.stderr)
+        results["probes"] = check_probes()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+
+    failed = False
+    for name in ("hosts", "probes"):
+        for check in results.get(name, {}).get("failed_checks", []):
+            print(f"{name.title()} check failed: {check}", file=sys.stderr)
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,50 @@
+import asyncio
+import glob
+import gzip
+import hashlib
+import io
 import json
 import logging
 import os
 import re
+import signal
+import ssl
+import tempfile
 import threading
 import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Tuple, List, Generator, Set
-from urllib.parse import urljoin
+from types import SimpleNamespace
+from typing import Dict, FrozenSet, Tuple, List, Generator, NamedTuple, Optional, Set, Union
+from urllib.parse import urljoin, urlsplit
 
 import crossplane
 import docker
-from docker.errors import NotFound
+from docker.errors import DockerException, NotFound
 from docker.models.containers import Container
+from requests.exceptions import RequestException
 import yaml
-from watchdog.events import FileSystemEventHandler
+from watchdog.events import (
+    EVENT_TYPE_CLOSED, EVENT_TYPE_CREATED, EVENT_TYPE_DELETED, EVENT_TYPE_MODIFIED, EVENT_TYPE_MOVED,
+    FileSystemEventHandler,
+)
 from watchdog.observers import Observer
 
-client = docker.from_env()
+# Optional, only used to optimize the published assets. The image installs
+# brotli, as its lighttpd.conf serves the .br siblings to clients accepting them
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
 
 # ===================================================
 #                     LOGGER
@@ -58,9 +86,15 @@ logger = logging.getLogger(__name__)
 # ===================================================
 #                  CONFIGURATION
 # ===================================================
-ASSETS_PATH   = Path("/www/assets")
+# Root served by lighttpd
+WWW_PATH      = Path(os.getenv("WWW_PATH", "/www"))
+ASSETS_PATH   = WWW_PATH / Path("assets")
 SELFHST_ICONS = ASSETS_PATH / Path("selfhst-icons/png")
 CUSTOM_ICONS  = ASSETS_PATH / Path("custom")
+CONFIG_PATH   = ASSETS_PATH / Path("config.yml")
+STATUS_PATH   = ASSETS_PATH / Path("status.json")
+# Downscaled, content-hashed copies of the icons on the dashboard
+OPTIMIZED_ICONS = ASSETS_PATH / Path("plato-icons")
 
 NGINX_CONFIG_FOLDER = Path("/etc/nginx")
 NGINX_CONFIG_PATH = NGINX_CONFIG_FOLDER / "nginx.conf"
@@ -73,10 +107,72 @@ CATEGORY_ICONS  = os.getenv("CATEGORY_ICONS")
 
 CATEGORY_ICONS_DICT: Dict[str, str] = {}
 
+# Format of config.yml: "yaml", or "json" which Homer's YAML loader also reads and is faster to write
+CONFIG_FORMAT = os.getenv("CONFIG_FORMAT", "yaml").lower()
+
+# Write one page per category (or PAGE_GROUPS group) and an index linking them instead of a single config.yml
+SPLIT_PAGES = os.getenv("SPLIT_PAGES", "False").lower() in ("1", "true", "yes")
+PAGE_GROUPS = os.getenv("PAGE_GROUPS")
+
+PAGE_GROUPS_DICT: Dict[str, str] = {}
+
+# Publish downscaled, cache-busted copies of the icons on the dashboard
+OPTIMIZE_ICONS = os.getenv("OPTIMIZE_ICONS", "True").lower() in ("1", "true", "yes")
+ICON_SIZE      = int(os.getenv("ICON_SIZE", "128"))
+
+# Seconds without events before a burst is regenerated
+REGEN_QUIET_WINDOW = float(os.getenv("REGEN_QUIET_WINDOW", "1"))
+# Max seconds a pending regeneration can be postponed by a continuous burst
+REGEN_MAX_LATENCY  = float(os.getenv("REGEN_MAX_LATENCY", "10"))
+
+# Max images whose exposed ports and labels are kept in memory
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "256"))
+
+# Max concurrent container inspects during a full scan
+DOCKER_INSPECT_WORKERS = max(1, int(os.getenv("DOCKER_INSPECT_WORKERS", "8")))
+
+# Timeout of Docker API calls, so a slow daemon cannot stall the others
+DOCKER_TIMEOUT = int(os.getenv("DOCKER_TIMEOUT", "10"))
+# Max seconds between reconnections to a Docker daemon that failed, backing off from 1s
+DOCKER_RETRY_INTERVAL = float(os.getenv("DOCKER_RETRY_INTERVAL", "10"))
+
+# Max Docker events buffered per host between intake and processing
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+
+# Probe the services from Plato and publish their status in assets/status.json
+PROBE_SERVICES    = os.getenv("PROBE_SERVICES", "False").lower() in ("1", "true", "yes")
+PROBE_INTERVAL    = float(os.getenv("PROBE_INTERVAL", "60"))
+PROBE_TIMEOUT     = float(os.getenv("PROBE_TIMEOUT", "5"))
+PROBE_CONCURRENCY = int(os.getenv("PROBE_CONCURRENCY", "16"))
+
+# Snapshot of the container and nginx state used to warm start, empty to disable it
+STATE_PATH = os.getenv("STATE_PATH", "/var/lib/plato/state.json")
+
+# Port of the Prometheus metrics endpoint, empty to disable it
+METRICS_PORT = os.getenv("METRICS_PORT", "9180")
+
+# Push published config changes to the open dashboards
+LIVE_UPDATES = os.getenv("LIVE_UPDATES", "False").lower() in ("1", "true", "yes")
+# Local port of the live update stream, the one lighttpd.conf proxies plato/events to
+LIVE_PORT = 9181
+
+# Journal of the Docker responses and events Plato sees, empty to disable recording
+RECORD_EVENTS = os.getenv("RECORD_EVENTS", "")
+# Replay a journal instead of connecting to Docker, then report and exit
+REPLAY_EVENTS = os.getenv("REPLAY_EVENTS", "")
+# Replay speed multiplier, 0 replays as fast as possible
+REPLAY_SPEED  = float(os.getenv("REPLAY_SPEED", "1"))
+
+# Comma separated hostname=endpoint pairs, e.g. "kiwi=unix:///var/run/docker.sock, pear=tcp://pear:2375"
+DOCKER_HOSTS = os.getenv("DOCKER_HOSTS")
+
 # Load Base theme
-THEMES_PATH = Path("/www/themes")
+THEMES_PATH = WWW_PATH / Path("themes")
 THEME = os.getenv("THEME", "default").lower()
 THEME_PATH = THEMES_PATH / Path(f"{THEME}.json")
+if not THEME_PATH.exists():
+    # Running from a checkout, e.g. to replay a journal into an empty WWW_PATH
+    THEME_PATH = Path(__file__).resolve().parent / "themes" / Path(f"{THEME}.json")
 if not THEME_PATH.exists():
     logger.error(f"Theme {THEME} does not exist")
     exit(1)
@@ -131,6 +227,349 @@ configuration = {
     'services': []
 }
 
+# ===================================================
+#                  METRICS
+# ===================================================
+
+# Upper bounds, in seconds, of the stage duration histogram buckets
+METRIC_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRIC_HELP = {
+    "plato_stage_duration_seconds":  ("histogram", "Duration of each stage of the pipeline"),
+    "plato_docker_api_calls_total":  ("counter", "Docker API calls made"),
+    "plato_events_received_total":   ("counter", "Container events read from the Docker event streams"),
+    "plato_events_coalesced_total":  ("counter", "Change requests merged into an already pending regeneration"),
+    "plato_regenerations_total":     ("counter", "Dashboard regenerations"),
+    "plato_publishes_total":         ("counter", "Rendered configs written or skipped because unchanged"),
+    "plato_nginx_reloads_total":     ("counter", "Nginx config reloads"),
+    "plato_containers":              ("gauge", "Containers shown on the dashboard"),
+    "plato_live_clients":            ("gauge", "Dashboards connected to the live update stream"),
+}
+
+
+class Metrics:
+    """Thread-safe counters, gauges and histograms rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            # Per bucket counts, then sum and count
+            histogram = self._histograms.setdefault(key, [0] * (len(METRIC_BUCKETS) + 2))
+            for i, bound in enumerate(METRIC_BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def totals(self, name: str, label: str) -> Dict[str, Tuple[int, float]]:
+        """Label value -> (count, sum) of a histogram"""
+        with self._lock:
+            return {
+                dict(labels).get(label, ""): (int(histogram[-1]), histogram[-2])
+                for (metric, labels), histogram in self._histograms.items()
+                if metric == name
+            }
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("plato_stage_duration_seconds", time.perf_counter() - start, stage=stage)
+
+    def render(self) -> str:
+        def fmt(labels) -> str:
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+        with self._lock:
+            values = sorted(self._values.items())
+            histograms = sorted(self._histograms.items())
+
+        lines = []
+        for name, (kind, description) in METRIC_HELP.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            for (metric, labels), value in values:
+                if metric == name:
+                    lines.append(f"{name}{fmt(labels)} {value}")
+
+            for (metric, labels), histogram in histograms:
+                if metric != name:
+                    continue
+                for bound, count in zip(METRIC_BUCKETS, histogram):
+                    lines.append(f"{name}_bucket{fmt(labels + (('le', str(bound)),))} {count}")
+                lines.append(f"{name}_bucket{fmt(labels + (('le', '+Inf'),))} {histogram[-1]}")
+                lines.append(f"{name}_sum{fmt(labels)} {histogram[-2]}")
+                lines.append(f"{name}_count{fmt(labels)} {histogram[-1]}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+async def _serve_metrics_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await reader.readline()
+        # Skip the headers
+        while (await reader.readline()).strip():
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", metrics.render().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            status, body, content_type = "404 Not Found", b"Not Found\n", "text/plain"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_metrics(port: int):
+    server = await asyncio.start_server(_serve_metrics_request, port=port)
+    logger.info(f"Serving metrics on port {port}")
+    async with server:
+        await server.serve_forever()
+
+# ===================================================
+#                  PUBLISHING
+# ===================================================
+
+# Generations that rewrote config files vs. ones that rendered identical output
+publish_stats = {"written": 0, "skipped": 0}
+# Path -> hash of the published config files, seeded from disk on the first publish
+_published_hashes: Optional[Dict[Path, str]] = None
+
+
+
+def atomic_write(path: Path, data: Union[str, bytes]):
+    """Write to a temporary sibling and rename it over path, so readers never see a partial file"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp creates 0600 files, lighttpd must still be able to read them
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _published_files() -> Dict[Path, str]:
+    """Hashes of the config files a previous run fully published in ASSETS_PATH"""
+    paths = [CONFIG_PATH, *ASSETS_PATH.glob("page-*.yml")]
+    return {
+        path: hashlib.sha256(path.read_bytes()).hexdigest()
+        for path in paths
+        # Files left without siblings, e.g. by an older version, are published again
+        if path.exists() and all(sibling.exists() for sibling in compressed_siblings(path))
+    }
+
+
+def publish_config(files: Dict[Path, str]) -> List[Path]:
+    """Publish the rendered config files that differ from what is already published; returns the files written or removed"""
+    global _published_hashes
+
+    if _published_hashes is None:
+        # Pick up the output of a previous run to avoid a rewrite on restart
+        _published_hashes = _published_files()
+
+    written: List[Path] = []
+    removed: List[Path] = []
+    with metrics.time("file_write"):
+        for path, rendered in files.items():
+            digest = hashlib.sha256(rendered.encode("utf-8")).hexdigest()
+            if digest != _published_hashes.get(path):
+                publish_file(path, rendered)
+                _published_hashes[path] = digest
+                written.append(path)
+
+        # Pages of categories that are gone, or every page when SPLIT_PAGES was turned off
+        for path in _published_hashes.keys() - files.keys():
+            unpublish_file(path)
+            del _published_hashes[path]
+            removed.append(path)
+
+    if not written and not removed:
+        publish_stats["skipped"] += 1
+        metrics.inc("plato_publishes_total", result="skipped")
+        logger.info(f"Configuration unchanged, skipping write ({publish_stats['written']} written, {publish_stats['skipped']} skipped)")
+        return []
+
+    publish_stats["written"] += 1
+    metrics.inc("plato_publishes_total", result="written")
+    changes = ", ".join([path.name for path in written] + [f"-{path.name}" for path in removed])
+    logger.info(f"Configuration published on {ASSETS_PATH}: {changes} ({publish_stats['written']} written, {publish_stats['skipped']} skipped)")
+    return written + removed
+
+# ===================================================
+#                  ASSET OPTIMIZATION
+# ===================================================
+
+# (logo, mtime) -> optimized logo, so each icon is only processed once
+_optimized_icons: Dict[Tuple[str, int], str] = {}
+# Names of the files in OPTIMIZED_ICONS, seeded from disk on the first cleanup, and the ones
+# the newest render references; unused files are only removed once a config is published
+_icon_files: Optional[Set[str]] = None
+_referenced_icons: Set[str] = set()
+_icons_lock = threading.Lock()
+# Optimized icons used by the last render, to publish along with it
+_rendered_icons: Set[str] = set()
+
+
+def compressed_siblings(path: Path) -> List[Path]:
+    """The compressed copies publish_file writes next to path"""
+    siblings = [path.with_name(f"{path.name}.gz")]
+    if brotli:
+        siblings.append(path.with_name(f"{path.name}.br"))
+    return siblings
+
+
+def publish_file(path: Path, data: str):
+    """Write a generated file with gzip (and brotli when available) siblings for lighttpd to serve"""
+    encoded = data.encode("utf-8")
+
+    # Siblings first, so a new file is never served with stale compressed content for long
+    atomic_write(path.with_name(f"{path.name}.gz"), gzip.compress(encoded, compresslevel=9, mtime=0))
+    if brotli:
+        # Max quality is an order of magnitude slower for a few bytes less
+        atomic_write(path.with_name(f"{path.name}.br"), brotli.compress(encoded, quality=8))
+
+    atomic_write(path, encoded)
+
+
+def unpublish_file(path: Path):
+    """Remove a file written by publish_file and its compressed siblings"""
+    for stale in (path, path.with_name(f"{path.name}.gz"), path.with_name(f"{path.name}.br")):
+        stale.unlink(missing_ok=True)
+
+
+def _downscale_icon(source: Path) -> bytes:
+    if Image is None:
+        return source.read_bytes()
+
+    with Image.open(source) as image:
+        image.thumbnail((ICON_SIZE, ICON_SIZE))
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG", optimize=True)
+
+    data = buffer.getvalue()
+    # Already small icons can grow when re-encoded
+    original = source.read_bytes()
+    return data if len(data) < len(original) else original
+
+
+def optimize_icon(logo: str) -> str:
+    """Downscaled, content-hashed copy of an indexed PNG icon; other logos are returned as is"""
+    # The index knows when each icon last changed, so nothing is stat'ed on a regeneration
+    mtime = icon_index.mtime(logo)
+    if mtime is None:
+        return logo
+
+    source = WWW_PATH / logo
+    key = (logo, mtime)
+
+    optimized = _optimized_icons.get(key)
+    if optimized:
+        _reference_icon(optimized)
+        return optimized
+
+    try:
+        data = _downscale_icon(source)
+    except Exception as e:
+        logger.warning(f"Could not optimize icon {logo}: {e}")
+        _optimized_icons[key] = logo
+        return logo
+
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    target = OPTIMIZED_ICONS / f"{source.stem}.{digest}.png"
+    if not target.exists():
+        OPTIMIZED_ICONS.mkdir(parents=True, exist_ok=True)
+        atomic_write(target, data)
+
+    optimized = str(target.relative_to(WWW_PATH))
+    _optimized_icons[key] = optimized
+    _reference_icon(optimized)
+    return optimized
+
+
+def _reference_icon(optimized: str):
+    name = Path(optimized).name
+    with _icons_lock:
+        _referenced_icons.add(name)
+        if _icon_files is not None:
+            _icon_files.add(name)
+
+
+def optimize_logos(services: List[dict]):
+    """Point the logos of the services to optimized icons"""
+    global _rendered_icons
+
+    used = set()
+    for category in services:
+        for item in category["items"]:
+            if "logo" in item:
+                item["logo"] = optimize_icon(item["logo"])
+                used.add(Path(item["logo"]).name)
+
+    for key, optimized in list(_optimized_icons.items()):
+        if Path(optimized).name not in used:
+            del _optimized_icons[key]
+
+    _rendered_icons = used
+    with _icons_lock:
+        _referenced_icons.intersection_update(used)
+
+
+def remove_unused_icons(published: Set[str]):
+    """
+    Delete the optimized icons a just published config no longer uses.
+
+    Icons the newest render, finished or not, references are kept too, as
+    the config using them may not be published yet.
+    """
+    global _icon_files
+
+    with _icons_lock:
+        if _icon_files is None:
+            _icon_files = {path.name for path in OPTIMIZED_ICONS.iterdir()} if OPTIMIZED_ICONS.exists() else set()
+
+        stale = _icon_files - published - _referenced_icons
+        _icon_files -= stale
+
+    for name in stale:
+        (OPTIMIZED_ICONS / name).unlink(missing_ok=True)
+
 # ===================================================
 #                  MANIFEST
 # ===================================================
@@ -154,8 +593,7 @@ manifest = {
 MANIFEST_PATH = ASSETS_PATH / Path("manifest.json")
 
 def write_manifest():
-    with MANIFEST_PATH.open("w", encoding="utf-8") as f:
-        json.dump(manifest, f, indent=4)
+    publish_file(MANIFEST_PATH, json.dumps(manifest, indent=4))
 
     logger.debug("Manifest content:\n%s", json.dumps(manifest, indent=4))
     logger.info(f"Manifest generated on {MANIFEST_PATH}")
@@ -164,125 +602,1377 @@ def write_manifest():
 #                  CONTAINER UTILS
 # ===================================================
 
-def safe_list_containers(all=True) -> Generator[Container, None, None]:
-    for c in client.api.containers(all=all):
-        cid = c["Id"]
+# Pushed down to the Docker API so unlabelled and stopped containers never cross the socket
+PLATO_CONTAINER_FILTERS = {"label": "plato.category", "status": "running"}
+
+# Keys of a container list entry needed to build a record without an inspect
+SUMMARY_KEYS = {"Id", "Names", "Image", "Labels", "State", "Ports"}
+
+def safe_inspect_container(client: docker.DockerClient, cid: str) -> Optional[Container]:
+    metrics.inc("plato_docker_api_calls_total", call="inspect")
+    try:
+        with metrics.time("container_inspect"):
+            return client.containers.get(cid)
+    except NotFound:
+        # Container vanished between list and inspect
+        return None
+
+def safe_inspect_containers(client: docker.DockerClient, cids: List[str]) -> Generator[Container, None, None]:
+    with ThreadPoolExecutor(max_workers=DOCKER_INSPECT_WORKERS) as pool:
+        for container in pool.map(lambda cid: safe_inspect_container(client, cid), cids):
+            if container is not None:
+                yield container
+
+# Events that (re)start a container and need it to be re-read from the daemon
+REFRESH_ACTIONS = {"start", "restart", "unpause", "rename"}
+# Events after which the container is no longer shown
+REMOVE_ACTIONS  = {"die", "stop", "pause", "destroy"}
+
+
+class ContainerRecord(NamedTuple):
+    """Compact view of a container with only the fields Plato needs"""
+    id: str
+    name: str
+    image: str
+    labels: Dict[str, str]
+    ports: FrozenSet[Tuple[int, int]]
+    image_id: str = ""
+    # From the image config when the published ports are ambiguous, None until it could be read
+    exposed_ports: Optional[FrozenSet[int]] = None
+    image_title: str = ""
+    # Other names reverse proxies reach the container by: Compose service and network aliases
+    aliases: FrozenSet[str] = frozenset()
+
+
+def _network_aliases(networks: Optional[dict]) -> Set[str]:
+    aliases = set()
+    for network in (networks or {}).values():
+        aliases.update((network or {}).get("Aliases") or [])
+        aliases.update((network or {}).get("DNSNames") or [])
+    return aliases
+
+
+def _build_record(cid: str, status: str, name: str, image: str, labels: Dict[str, str], ports: Set[Tuple[int, int]], image_id: str, aliases: Set[str]) -> Optional[ContainerRecord]:
+    # skip stopped/paused containers
+    if status != "running":
+        return None
+
+    if not labels.get("plato.category"):
+        return None
+
+    return ContainerRecord(
+        id=cid,
+        name=name.lower(),
+        image=image or "",
+        # Reverse proxy labels are kept for the route index
+        labels={k: v for k, v in labels.items() if k.startswith(("plato.", "caddy", "traefik."))},
+        ports=frozenset(ports),
+        image_id=image_id or "",
+        aliases=frozenset(
+            alias.lower()
+            for alias in aliases | {labels.get("com.docker.compose.service", "")}
+            # Short IDs are aliases too, but no proxy targets them
+            if alias and alias != cid[:12]
+        ) - {name.lower()},
+    )
+
+
+def make_record(container: Container) -> Optional[ContainerRecord]:
+    # Find used TCP ports
+    ports = set()
+    for port_proto, host_mappings in (container.attrs['NetworkSettings']['Ports'] or {}).items():
+        internal_port, proto = port_proto.split('/')
+        if proto == "tcp" and host_mappings:
+            for mapping in host_mappings:
+                ports.add((int(internal_port), int(mapping['HostPort'])))
+
+    return _build_record(
+        container.id, container.status, container.name,
+        container.attrs['Config'].get('Image'), container.labels, ports, container.attrs.get('Image'),
+        _network_aliases(container.attrs['NetworkSettings'].get('Networks')),
+    )
+
+
+def make_record_from_summary(summary: dict) -> Optional[ContainerRecord]:
+    """Build a record from a container list entry, which already has labels and ports"""
+    ports = {
+        (int(port["PrivatePort"]), int(port["PublicPort"]))
+        for port in summary["Ports"] or []
+        if port.get("Type") == "tcp" and port.get("PublicPort")
+    }
+
+    # Linked containers also list "/other/alias" names
+    names = summary["Names"] or [""]
+    name = next((n for n in names if n.count("/") == 1), names[0]).lstrip("/")
+
+    return _build_record(
+        summary["Id"], summary["State"], name, summary["Image"], summary["Labels"] or {}, ports, summary.get("ImageID"),
+        _network_aliases((summary.get("NetworkSettings") or {}).get("Networks")),
+    )
+
+
+def needs_image(record: ContainerRecord) -> bool:
+    """Whether the UI port can only be told from the image config"""
+    return len(record.ports) != 1 and not {"plato.url", "plato.ui-port"} & record.labels.keys()
+
+
+def with_image(client: docker.DockerClient, record: ContainerRecord) -> ContainerRecord:
+    """Add the exposed ports and title of the image to a record that needs them"""
+    if not needs_image(record):
+        return record
+
+    image = image_cache.get(client, record.image_id)
+    if image is None:
+        return record
+    return record._replace(
+        exposed_ports=image.exposed_ports,
+        # The OCI title names the service better than a registry path
+        image_title=image.labels.get("org.opencontainers.image.title", "").lower(),
+    )
+
+
+def list_container_records(client: docker.DockerClient, **filters) -> List[ContainerRecord]:
+    """List Plato containers, only inspecting the ones whose list entry is incomplete"""
+    records = []
+    incomplete = []
+
+    metrics.inc("plato_docker_api_calls_total", call="list")
+    with metrics.time("container_list"):
+        summaries = client.api.containers(filters={**PLATO_CONTAINER_FILTERS, **filters})
+
+    for summary in summaries:
+        if SUMMARY_KEYS <= summary.keys():
+            record = make_record_from_summary(summary)
+            if record:
+                records.append(record)
+        else:
+            incomplete.append(summary["Id"])
+
+    if incomplete:
+        logger.debug(f"Inspecting {len(incomplete)} containers with incomplete list entries")
+        for container in safe_inspect_containers(client, incomplete):
+            record = make_record(container)
+            if record:
+                records.append(record)
+
+    return [with_image(client, record) for record in records]
+
+
+class ContainerStore:
+    """In-memory state of the containers shown on the dashboard, keyed by ID"""
+
+    def __init__(self):
+        self._records: Dict[str, ContainerRecord] = {}
+        self._lock = threading.Lock()
+
+    def replace(self, records: List[ContainerRecord]):
+        with self._lock:
+            self._records = {record.id: record for record in records}
+
+    def records(self) -> List[ContainerRecord]:
+        with self._lock:
+            return list(self._records.values())
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def remove(self, cid: str) -> bool:
+        with self._lock:
+            return self._records.pop(cid, None) is not None
+
+    def update(self, record: ContainerRecord) -> bool:
+        with self._lock:
+            changed = self._records.get(record.id) != record
+            self._records[record.id] = record
+        return changed
+
+class ImageMetadata(NamedTuple):
+    """What Plato needs from an image config to find the UI port"""
+    exposed_ports: FrozenSet[int]
+    labels: Dict[str, str]
+
+
+class ImageCache:
+    """
+    LRU of image metadata keyed by image ID.
+
+    An image ID is the hash of its config, so entries never go stale; they
+    are only evicted when the cache is full or the image is no longer used.
+    """
+
+    def __init__(self, size: int = IMAGE_CACHE_SIZE):
+        self._size = size
+        self._images: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, client, image_id: str) -> Optional[ImageMetadata]:
+        """Metadata of an image, or None when it is gone or the daemon could not be reached"""
+        if not image_id:
+            return None
+
+        with self._lock:
+            if image_id in self._images:
+                self._images.move_to_end(image_id)
+                return self._images[image_id]
+
+        metrics.inc("plato_docker_api_calls_total", call="image_inspect")
         try:
-            yield client.containers.get(cid)
+            config = client.api.inspect_image(image_id).get("Config") or {}
         except NotFound:
-            # Container vanished between list and inspect
+            logger.debug(f"Image {image_id} no longer exists")
+            image = None
+        except (DockerException, RequestException) as e:
+            # Not cached, the next listing retries
+            logger.warning(f"Could not inspect image {image_id}: {e}")
+            return None
+        else:
+            image = ImageMetadata(
+                exposed_ports=frozenset(
+                    int(port) for port, proto in (key.split("/") for key in config.get("ExposedPorts") or {})
+                    if proto == "tcp" and port.isdigit()
+                ),
+                labels=config.get("Labels") or {},
+            )
+
+        with self._lock:
+            self._images[image_id] = image
+            while len(self._images) > self._size:
+                self._images.popitem(last=False)
+        return image
+
+    def prune(self, image_ids: Set[str]):
+        """Forget the images no container on the dashboard runs"""
+        with self._lock:
+            for image_id in self._images.keys() - image_ids:
+                del self._images[image_id]
+
+
+image_cache = ImageCache()
+
+# ===================================================
+#                  DOCKER HOSTS
+# ===================================================
+
+# Only these actions can change what the dashboard shows
+DASHBOARD_ACTIONS = REFRESH_ACTIONS | REMOVE_ACTIONS
+
+# Seconds to wait for the daemon to replay the last seen event when resuming a stream
+RESUME_TIMEOUT = 2
+
+
+def event_timestamp(time_nano: int) -> str:
+    """timeNano of an event in the seconds.nanoseconds form of the events API since parameter"""
+    return f"{time_nano // 10**9}.{time_nano % 10**9:09d}"
+
+
+class DockerHost:
+    """
+    A Docker daemon whose containers are shown on the dashboard.
+
+    Each host keeps its own container store and consumes its own event
+    stream in its own tasks, so a slow or unreachable daemon only delays
+    its own tiles.
+    """
+
+    def __init__(self, hostname: str, base_url: Optional[str] = None):
+        self.hostname = hostname
+        self.base_url = base_url
+        self.client: Optional[docker.DockerClient] = None
+        self.store = ContainerStore()
+        # timeNano of the last event applied to the store, where a new stream resumes from
+        self.last_event: Optional[int] = None
+        # The event stream blocks its reader for good, keep it out of the shared default executor
+        self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"events-{hostname}")
+
+    def connect(self):
+        # Keep one pooled connection per inspect worker
+        pool_size = max(DOCKER_INSPECT_WORKERS, 10)
+        if self.base_url:
+            self.client = docker.DockerClient(base_url=self.base_url, timeout=DOCKER_TIMEOUT, max_pool_size=pool_size)
+        else:
+            self.client = docker.from_env(timeout=DOCKER_TIMEOUT, max_pool_size=pool_size)
+
+        if event_journal:
+            self.client = recording_client(self.client, event_journal, self.hostname)
+
+    def load(self):
+        start = time.monotonic()
+
+        records = list_container_records(self.client)
+        self.store.replace(records)
+        metrics.set("plato_containers", len(records), host=self.hostname)
+
+        logger.info(f"Loaded {len(records)} Plato containers from {self.hostname} in {time.monotonic() - start:.2f}s")
+
+    def reconcile(self) -> bool:
+        """Re-list the containers after missed events; returns whether the dashboard changed"""
+        records = list_container_records(self.client)
+        changed = {record.id: record for record in records} != {record.id: record for record in self.store.records()}
+        self.store.replace(records)
+        metrics.set("plato_containers", len(records), host=self.hostname)
+
+        logger.info(f"Reconciled {len(records)} Plato containers from {self.hostname}")
+        return changed
+
+    def refresh(self, cid: str) -> bool:
+        records = list_container_records(self.client, id=cid)
+
+        if not records:
+            return self.store.remove(cid)
+        return self.store.update(records[0])
+
+    def handle_event(self, event) -> bool:
+        """Apply a container event; returns whether the dashboard changed"""
+        action = event["Action"]
+        cid = event["Actor"]["ID"]
+
+        if action in REMOVE_ACTIONS:
+            changed = self.store.remove(cid)
+        elif action in REFRESH_ACTIONS:
+            changed = self.refresh(cid)
+        else:
+            return False
+
+        metrics.set("plato_containers", len(self.store), host=self.hostname)
+        return changed
+
+    async def _ingest(self, events, events_queue: asyncio.Queue, resumed: asyncio.Future):
+        """
+        Read the blocking event stream off the loop and queue the relevant events.
+
+        resumed is resolved with whether the stream starts with the last
+        applied event, i.e. whether the daemon still had every event since.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                event = await loop.run_in_executor(self._reader, next, events, None)
+            except Exception as e:
+                # Still apply what was received before the stream broke
+                logger.error(f"Event stream of {self.hostname} failed: {e}")
+                break
+            if event is None:
+                break
+
+            if not resumed.done():
+                resumed.set_result(self.last_event is not None and event.get("timeNano") == self.last_event)
+                if resumed.result():
+                    # Already applied
+                    continue
+
+            metrics.inc("plato_events_received_total", host=self.hostname)
+            action = event["Action"]
+            if action not in DASHBOARD_ACTIONS:
+                continue
+
+            logger.debug(f"Container event on {self.hostname}: {action} on {event['Actor']['Attributes'].get('name')}")
+            await events_queue.put(event)
+
+        await events_queue.put(None)
+
+    async def _apply(self, events_queue: asyncio.Queue, on_change):
+        while True:
+            event = await events_queue.get()
+            if event is None:
+                return
+            changed = await asyncio.to_thread(self.handle_event, event)
+            self.last_event = event.get("timeNano", self.last_event)
+            if changed:
+                on_change()
+
+    async def _catch_up(self, resumed: asyncio.Future) -> bool:
+        """Bring the store up to date with a new stream; returns whether the dashboard changed"""
+        if self.last_event is None:
+            await asyncio.to_thread(self.load)
+            return True
+
+        try:
+            covered = await asyncio.wait_for(asyncio.shield(resumed), RESUME_TIMEOUT)
+        except TimeoutError:
+            # A restarted daemon has no events to replay
+            covered = False
+
+        if covered:
+            logger.info(f"Resumed the event stream of {self.hostname}")
+            return False
+
+        logger.warning(f"Events missed on {self.hostname} are no longer available, reconciling")
+        return await asyncio.to_thread(self.reconcile)
+
+    async def watch(self, on_change, reconnect: bool = True):
+        """
+        Load the containers and follow the event stream, reconnecting on failure.
+
+        A new stream resumes after the last applied event so the daemon
+        replays what was missed, and the containers are only re-listed
+        when it can no longer do so.
+        """
+        filters = {"type": "container", "label": "plato.category", "event": sorted(DASHBOARD_ACTIONS)}
+        retry_interval = 1
+
+        while True:
+            events = None
+            try:
+                if self.client is None:
+                    await asyncio.to_thread(self.connect)
+
+                since = {"since": event_timestamp(self.last_event)} if self.last_event is not None else {}
+                # Subscribe before listing so no event is lost in between
+                metrics.inc("plato_docker_api_calls_total", call="events")
+                events = await asyncio.to_thread(self.client.events, decode=True, filters=filters, **since)
+
+                events_queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+                resumed = asyncio.get_running_loop().create_future()
+                async with asyncio.TaskGroup() as tasks:
+                    tasks.create_task(self._ingest(events, events_queue, resumed))
+                    # Events queue up while catching up and are applied after
+                    if await self._catch_up(resumed):
+                        on_change()
+                    retry_interval = 1
+                    tasks.create_task(self._apply(events_queue, on_change))
+
+                logger.warning(f"Event stream of {self.hostname} ended")
+            except Exception as e:
+                logger.error(f"Docker host {self.hostname} failed: {e}")
+            finally:
+                if events is not None:
+                    # Unblocks the thread still reading the stream
+                    events.close()
+
+            if not reconnect:
+                return
+            logger.info(f"Reconnecting to {self.hostname} in {retry_interval:g}s")
+            await asyncio.sleep(retry_interval)
+            retry_interval = min(retry_interval * 2, DOCKER_RETRY_INTERVAL)
+
+
+docker_hosts: List[DockerHost] = []
+
+
+def parse_docker_hosts(value: Optional[str]) -> List[DockerHost]:
+    if not value:
+        # Local daemon from the environment
+        return [DockerHost(HOSTNAME)]
+
+    hosts = []
+    for item in value.split(","):
+        if "=" not in item:
             continue
+        hostname, base_url = (part.strip() for part in item.split("=", 1))
+        hosts.append(DockerHost(hostname, base_url))
+    return hosts
+
+# ===================================================
+#                  EVENT JOURNAL
+# ===================================================
+
+JOURNAL_VERSION = 1
+
+
+class EventJournal:
+    """
+    Gzipped JSON lines of the Docker responses and events seen by Plato.
+
+    The first line names the hosts, then each line is
+    [seconds since start, host, kind, key, payload] where kind is "list"
+    (key: filters), "inspect" (key: container ID, payload: attrs or null
+    when not found), "image" (key: image ID, payload: attrs or null) or
+    "event".
+    """
+
+    def __init__(self, path: Path, hostnames: List[str]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._flushed = self._start
+        self._write({"version": JOURNAL_VERSION, "hosts": hostnames})
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def record(self, host: str, kind: str, key, payload):
+        with self._lock:
+            if self._file.closed:
+                # Stream readers can outlive the shutdown
+                return
+            now = time.monotonic()
+            self._write([round(now - self._start, 4), host, kind, key, payload])
+            # Each flush ends a deflate block, keep them rare
+            if now - self._flushed > 1:
+                self._file.flush()
+                self._flushed = now
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+event_journal: Optional[EventJournal] = None
+
+
+class _RecordingStream:
+    def __init__(self, stream, record):
+        self._stream = stream
+        self._record = record
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        event = next(self._stream)
+        self._record("event", None, event)
+        return event
+
+    def close(self):
+        self._stream.close()
+
+
+def recording_client(client: docker.DockerClient, journal: EventJournal, hostname: str) -> SimpleNamespace:
+    """Wrap the Docker calls Plato makes so their results are journaled"""
+    def record(kind, key, payload):
+        journal.record(hostname, kind, key, payload)
+
+    def list_containers(**kwargs):
+        summaries = client.api.containers(**kwargs)
+        record("list", kwargs.get("filters"), summaries)
+        return summaries
+
+    def inspect(cid):
+        try:
+            container = client.containers.get(cid)
+        except NotFound:
+            record("inspect", cid, None)
+            raise
+        record("inspect", cid, container.attrs)
+        return container
+
+    def inspect_image(image_id):
+        try:
+            attrs = client.api.inspect_image(image_id)
+        except NotFound:
+            record("image", image_id, None)
+            raise
+        record("image", image_id, attrs)
+        return attrs
+
+    def events(**kwargs):
+        return _RecordingStream(client.events(**kwargs), record)
+
+    return SimpleNamespace(
+        api=SimpleNamespace(containers=list_containers, inspect_image=inspect_image),
+        containers=SimpleNamespace(get=inspect),
+        events=events,
+    )
+
+
+def load_journal(path: Path) -> Tuple[List[str], Dict[str, list]]:
+    """Hostnames and per host entries of a journal"""
+    entries: Dict[str, list] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("version") != JOURNAL_VERSION:
+            raise ValueError(f"Unsupported journal version {header.get('version')}")
+        try:
+            for line in f:
+                entry = json.loads(line)
+                entries.setdefault(entry[1], []).append(entry)
+        except (EOFError, json.JSONDecodeError):
+            # Recording was killed before the journal was closed
+            logger.warning(f"Journal {path} is truncated, replaying what was recorded")
+
+    return header["hosts"], entries
+
+
+class _ReplayStream:
+    def __init__(self, events: List[Tuple[float, dict]], speed: float, start: float):
+        self._events = iter(events)
+        self._speed = speed
+        self._start = start
+        self._closed = threading.Event()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        entry = next(self._events, None)
+        if entry is None:
+            raise StopIteration
+
+        offset, event = entry
+        if self._speed:
+            self._closed.wait(max(0, self._start + offset / self._speed - time.monotonic()))
+        if self._closed.is_set():
+            raise StopIteration
+        return event
+
+    def close(self):
+        self._closed.set()
+
+
+def replay_client(entries: list, speed: float, start: float) -> SimpleNamespace:
+    """Serve the recorded responses of a host, in order, in place of its daemon"""
+    lists: Dict[str, deque] = {}
+    inspects: Dict[str, deque] = {}
+    images: Dict[str, dict] = {}
+    events: List[Tuple[float, dict]] = []
+
+    for offset, _, kind, key, payload in entries:
+        if kind == "list":
+            lists.setdefault(json.dumps(key, sort_keys=True), deque()).append(payload)
+        elif kind == "inspect":
+            inspects.setdefault(key, deque()).append(payload)
+        elif kind == "image" and payload is not None:
+            images[key] = payload
+        elif kind == "event":
+            events.append((offset, payload))
+
+    def next_response(responses: Optional[deque], default):
+        if not responses:
+            return default
+        # The last response is repeated once the recorded ones are used up
+        return responses.popleft() if len(responses) > 1 else responses[0]
+
+    def list_containers(filters=None, **kwargs):
+        return next_response(lists.get(json.dumps(filters, sort_keys=True)), [])
+
+    def inspect(cid):
+        attrs = next_response(inspects.get(cid), None)
+        if attrs is None:
+            raise NotFound(f"No such container: {cid}")
+        return Container(attrs=attrs)
+
+    def inspect_image(image_id):
+        if image_id not in images:
+            raise NotFound(f"No such image: {image_id}")
+        return images[image_id]
+
+    streams: List[_ReplayStream] = []
+
+    def subscribe(**kwargs):
+        # The whole recording is replayed on the first subscription
+        stream = _ReplayStream(events if not streams else [], speed, start)
+        streams.append(stream)
+        return stream
+
+    return SimpleNamespace(
+        api=SimpleNamespace(containers=list_containers, inspect_image=inspect_image),
+        containers=SimpleNamespace(get=inspect),
+        events=subscribe,
+        event_count=len(events),
+        last_event=events[-1][0] if events else 0.0,
+    )
+
+# ===================================================
+#                  EVENT SCHEDULER
+# ===================================================
+
+class RegenerationScheduler:
+    """
+    Coalesces bursts of dashboard changes into a single regeneration.
+
+    request() never waits: it only flags a pending regeneration. The
+    regenerate task renders once no request arrived for quiet_window
+    seconds, or max_latency seconds after the burst started, and hands
+    the result to the publish task. If publishing stalls, only the latest
+    render is kept.
+    """
+
+    def __init__(self, quiet_window=REGEN_QUIET_WINDOW, max_latency=REGEN_MAX_LATENCY):
+        self._quiet_window = quiet_window
+        self._max_latency = max_latency
+        self._pending = asyncio.Event()
+        self._requests = 0
+        self._rendered: asyncio.Queue = asyncio.Queue(maxsize=1)
+        # Requests made so far and requests covered by the last publish
+        self._version = 0
+        self._published_version = 0
+        self._published = asyncio.Event()
+
+    def request(self):
+        """Ask for a regeneration; must be called from the event loop"""
+        self._requests += 1
+        self._version += 1
+        self._pending.set()
+
+    def request_threadsafe(self, loop: asyncio.AbstractEventLoop):
+        """request() for callers running on other threads"""
+        return lambda: loop.call_soon_threadsafe(self.request)
+
+    async def _wait_quiet(self):
+        loop = asyncio.get_running_loop()
+        first = last = loop.time()
+
+        while True:
+            self._pending.clear()
+            timeout = min(last + self._quiet_window, first + self._max_latency) - loop.time()
+            if timeout <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._pending.wait(), timeout)
+            except TimeoutError:
+                return
+            last = loop.time()
+
+    async def regenerate(self):
+        while True:
+            await self._pending.wait()
+            await self._wait_quiet()
+
+            logger.debug(f"Coalesced {self._requests} changes")
+            metrics.inc("plato_events_coalesced_total", max(0, self._requests - 1))
+            self._requests = 0
+
+            metrics.inc("plato_regenerations_total")
+            version = self._version
+            rendered, services, icons = await asyncio.to_thread(self._render)
+
+            if self._rendered.full():
+                # Publisher is behind, the previous render is already stale
+                self._rendered.get_nowait()
+            self._rendered.put_nowait((version, rendered, services, icons))
+
+    @staticmethod
+    def _render() -> Tuple[Dict[Path, str], Dict[str, List[dict]], Set[str]]:
+        rendered = render_homer_config()
+        # Taken with the render, before another one replaces the services
+        return rendered, _rendered_services if LIVE_UPDATES else {}, _rendered_icons
+
+    async def publish(self):
+        startup = time.monotonic()
+        published = False
+
+        while True:
+            version, rendered, services, icons = await self._rendered.get()
+            written = await asyncio.to_thread(publish_config, rendered)
+            # Only once no published config points at them anymore
+            await asyncio.to_thread(remove_unused_icons, icons)
+            if written and LIVE_UPDATES:
+                live_updates.notify(written, services)
+            if STATE_PATH and (written or not Path(STATE_PATH).exists()):
+                await asyncio.to_thread(save_snapshot, Path(STATE_PATH))
+
+            self._published_version = version
+            self._published.set()
+
+            if not published:
+                published = True
+                logger.info(f"Startup completed in {time.monotonic() - startup:.2f}s")
+
+    async def drain(self):
+        """Wait until every change requested so far is published"""
+        while self._published_version < self._version:
+            self._published.clear()
+            await self._published.wait()
 
 # ===================================================
 #                  NGINX PARSING
 # ===================================================
 
-_nginx_config = {}
-_lock = threading.Lock()
-_nginx_cooldown = 5
-_latest_nginx_reload = 0
+# Seconds without nginx file changes before the config is reloaded
+_nginx_quiet_window = 2
+
+_valid_hostname = re.compile(r'^[a-zA-Z0-9.-]+$')
+_nginx_variable = re.compile(r"\$\{?(\w+)\}?")
+
+# (address, port, path) of a proxied service
+RouteKey = Tuple[str, int, str]
+
+
+def normalize_route_path(path: str) -> str:
+    return "/" + path.strip("/")
+
+
+class NginxProxy(NamedTuple):
+    """A location proxying to host:port, host being either an address or an upstream name"""
+    scheme: str
+    host: str
+    port: Optional[int]
+    path: str
+    url: str
+
 
-def get_nginx_port_url_map(nginx_conf=NGINX_CONFIG_PATH) -> Dict[int, List[str]]:
+def _set_variables(block: List[dict], variables: Dict[str, str]) -> Dict[str, str]:
+    """variables updated with the set directives of a block"""
+    variables = dict(variables)
+    for directive in block:
+        args = directive.get("args", [])
+        if directive.get("directive") == "set" and len(args) == 2:
+            variables[args[0].lstrip("$")] = args[1]
+    return variables
+
+
+def _proxy_target(value: str, variables: Dict[str, str]) -> Optional[Tuple[str, str, Optional[int], str]]:
+    """(scheme, host, port, path) of a proxy_pass target, None if it cannot be resolved statically"""
+    value = _nginx_variable.sub(lambda m: variables.get(m.group(1), m.group(0)), value)
+    if "$" in value:
+        return None
+
+    parts = urlsplit(value)
+    if parts.scheme not in ("http", "https") or not parts.hostname or parts.hostname == "unix":
+        return None
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    return parts.scheme, parts.hostname, port, normalize_route_path(parts.path)
+
+
+def _server_blocks(parsed: List[dict]) -> Generator[dict, None, None]:
+    for directive in parsed:
+        if directive.get("directive") == "server":
+            yield directive
+        elif directive.get("directive") == "http":
+            yield from _server_blocks(directive.get("block", []))
+
+
+def _server_proxies(parsed: List[dict]) -> List[NginxProxy]:
+    """Proxied targets of the server blocks of a single file"""
+    proxies = []
+
+    for server_block in _server_blocks(parsed):
+        server_names = []
+        scheme = "http"
+
+        for directive in server_block.get("block", []):
+            if directive["directive"] == "listen":
+                args = directive.get("args", [])
+                if any("443" in arg or arg == "ssl" for arg in args):
+                    scheme = "https"
+
+            elif directive["directive"] == "server_name":
+                for name in directive.get("args", []):
+                    name = name.strip()
+                    if name != "_" and _valid_hostname.match(name):
+                        server_names.append(name)
+
+        if not server_names:
+            continue  # skip blocks without valid hostnames
+
+        server_variables = _set_variables(server_block.get("block", []), {})
+
+        # Only process location blocks
+        for directive in server_block.get("block", []):
+            if directive.get("directive") != "location":
+                continue
+
+            args = directive.get("args", ["/"])
+            if args[0] in ("=", "^~") and len(args) > 1:
+                location_path = args[1]
+            elif args[0] in ("~", "~*") or args[0].startswith("@"):
+                continue  # regex and named locations have no URL
+            else:
+                location_path = args[0]
+
+            block = directive.get("block", [])
+            variables = _set_variables(block, server_variables)
+            for subdir in block:
+                if subdir.get("directive") != "proxy_pass":
+                    continue
+                target = _proxy_target(subdir.get("args", [""])[0], variables)
+                if target is None:
+                    continue
+                for name in server_names:
+                    url = f"{scheme}://{name}{location_path.rstrip('/')}"
+                    proxies.append(NginxProxy(*target, url))
+
+    return proxies
+
+
+def _upstreams(parsed: List[dict]) -> Dict[str, List[Tuple[str, int]]]:
+    """Upstream name -> (address, port) of its servers"""
+    upstreams: Dict[str, List[Tuple[str, int]]] = {}
+
+    for directive in parsed:
+        if directive.get("directive") == "http":
+            upstreams.update(_upstreams(directive.get("block", [])))
+        elif directive.get("directive") == "upstream" and directive.get("args"):
+            servers = upstreams.setdefault(directive["args"][0], [])
+            for server in directive.get("block", []):
+                if server.get("directive") != "server" or not server.get("args"):
+                    continue
+                parts = urlsplit(f"//{server['args'][0]}")
+                try:
+                    if parts.hostname and parts.hostname != "unix":
+                        servers.append((parts.hostname, parts.port or 80))
+                except ValueError:
+                    continue
+
+    return upstreams
+
+
+def _include_patterns(parsed: List[dict]) -> List[str]:
+    patterns = []
+    for directive in parsed:
+        if directive.get("directive") == "include":
+            patterns.extend(directive.get("args", []))
+        patterns.extend(_include_patterns(directive.get("block", [])))
+    return patterns
+
+
+class NginxFileEntry(NamedTuple):
+    """Cached contribution of one nginx file to the routes"""
+    signature: Tuple[int, int]
+    digest: str
+    proxies: List[NginxProxy]
+    upstreams: Dict[str, List[Tuple[str, int]]]
+    includes: List[str]
+
+
+class NginxParseCache:
+    """
+    Parses the nginx include tree one file at a time.
+
+    Files are keyed by path and only reparsed when their mtime/size changed
+    and their content hash differs from the cached one.
+    """
+
+    def __init__(self):
+        self._files: Dict[Path, NginxFileEntry] = {}
+        self._lock = threading.Lock()
+
+    def _parse_file(self, path: Path, signature: Tuple[int, int]) -> Optional[NginxFileEntry]:
+        try:
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        except OSError as e:
+            logger.warning(f"Could not read {path}: {e}")
+            return None
+
+        cached = self._files.get(path)
+        if cached and cached.digest == digest:
+            return cached._replace(signature=signature)
+
+        logger.debug(f"Parsing {path}")
+        # Single files have no surrounding http block to check the context against
+        parsed = crossplane.parse(str(path), single=True, check_ctx=False)
+        for error in parsed.get("errors", []):
+            logger.warning(f"Nginx parse error: {error.get('error')}")
+
+        directives = parsed["config"][0]["parsed"] if parsed.get("config") else []
+        return NginxFileEntry(signature, digest, _server_proxies(directives), _upstreams(directives), _include_patterns(directives))
+
+    def refresh(self, nginx_conf: Path) -> Dict[RouteKey, Set[str]]:
+        with self._lock:
+            config_dir = nginx_conf.parent
+            seen: Set[Path] = set()
+            level = [nginx_conf]
+            reparsed = 0
+
+            # Walk the include tree level by level, reparsing only the stale files. Sequentially:
+            # crossplane is pure Python, so threads contend on the GIL, and worker processes take
+            # longer to start than even thousands of files take to parse
+            while level:
+                current, stale = [], []
+                for path in level:
+                    if path in seen:
+                        continue
+                    seen.add(path)
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    current.append(path)
+                    signature = (st.st_mtime_ns, st.st_size)
+                    cached = self._files.get(path)
+                    if cached is None or cached.signature != signature:
+                        stale.append((path, signature))
+
+                entries = [self._parse_file(*item) for item in stale]
+
+                for (path, _), entry in zip(stale, entries):
+                    if entry is None:
+                        self._files.pop(path, None)
+                    else:
+                        self._files[path] = entry
+                reparsed += len(stale)
+
+                level = []
+                for path in current:
+                    entry = self._files.get(path)
+                    for pattern in entry.includes if entry else []:
+                        level.extend(Path(p) for p in sorted(glob.glob(str(config_dir / pattern))))
+
+            # Forget files that are no longer included
+            for path in set(self._files) - seen:
+                del self._files[path]
+
+            logger.debug(f"Reparsed {reparsed} of {len(self._files)} nginx files")
+
+            # Upstreams can be declared in another file than the servers using them
+            upstreams: Dict[str, List[Tuple[str, int]]] = {}
+            for entry in self._files.values():
+                for name, servers in entry.upstreams.items():
+                    upstreams.setdefault(name, []).extend(servers)
+
+            routes: Dict[RouteKey, Set[str]] = {}
+            for entry in self._files.values():
+                for proxy in entry.proxies:
+                    if proxy.port is None and proxy.host in upstreams:
+                        targets = upstreams[proxy.host]
+                    else:
+                        targets = [(proxy.host, proxy.port or (443 if proxy.scheme == "https" else 80))]
+                    for address, port in targets:
+                        routes.setdefault((address, port, proxy.path), set()).add(proxy.url)
+            return routes
+
+
+_nginx_parse_cache = NginxParseCache()
+
+
+def get_nginx_routes(nginx_conf=NGINX_CONFIG_PATH) -> Dict[RouteKey, List[str]]:
     logger.info("Parsing Nginx Config")
 
-    valid_hostname = re.compile(r'^[a-zA-Z0-9.-]+$')
-
-    parsed = crossplane.parse(nginx_conf)
-    port_url_map: Dict[int, Set[str]] = {}
-
-    for config in parsed.get("config", []):
-        for directive in config.get("parsed", []):
-            if directive.get("directive") == "server":
-                server_block = directive
-                server_names = []
-                scheme = "http"
-
-                for directive in server_block.get("block", []):
-                    if directive["directive"] == "listen":
-                        args = directive.get("args", [])
-                        if any("443" in arg or arg == "ssl" for arg in args):
-                            scheme = "https"
-
-                    elif directive["directive"] == "server_name":
-                        for name in directive.get("args", []):
-                            name = name.strip()
-                            if name != "_" and valid_hostname.match(name):
-                                server_names.append(name)
-
-                if not server_names:
-                    continue  # skip blocks without valid hostnames
-
-                # Only process location blocks
-                for directive in server_block.get("block", []):
-                    if directive.get("directive") == "location":
-                        location_path = directive.get("args", ["/"])[0]
-                        for subdir in directive.get("block", []):
-                            if subdir.get("directive") == "proxy_pass":
-                                proxy_target = subdir.get("args", [None])[0]
-                                if proxy_target:
-                                    match = re.search(r":(\d+)", proxy_target)
-                                    if match:
-                                        internal_port = match.group(1)
-                                        for name in server_names:
-                                            url = f"{scheme}://{name}{location_path.rstrip('/')}"
-                                            url = url.rstrip("=")
-                                            if url == f"{scheme}://{name}":
-                                                url = url.rstrip("/")
-                                            port_url_map.setdefault(int(internal_port), set()).add(url)
+    routes = _nginx_parse_cache.refresh(Path(nginx_conf))
 
     # Convert sets to sorted lists
-    ret = {port: sorted(urls) for port, urls in port_url_map.items()}
+    ret = {key: sorted(urls) for key, urls in routes.items()}
 
     if ret:
-        log_url_pairs = ''
-        for port in ret:
-            log_url_pairs += f"  {port} -> {ret[port]}\n"
-        logger.debug(log_url_pairs)
+        if logger.isEnabledFor(logging.DEBUG):
+            log_url_pairs = ''
+            for (address, port, path), urls in ret.items():
+                log_url_pairs += f"  {address}:{port}{path} -> {urls}\n"
+            logger.debug(log_url_pairs)
     else:
         logger.warning("Nginx config not found")
 
     return ret
 
 
-def _reload_nginx_config():
-    global _nginx_config, _latest_nginx_reload
-    now = time.time()
-    with _lock:
-        _latest_nginx_reload = now
+def _reload_nginx_config() -> bool:
+    """Reload the nginx routes; returns whether they changed"""
+    metrics.inc("plato_nginx_reloads_total")
     try:
-        new_config = get_nginx_port_url_map()
-        with _lock:
-            _nginx_config = new_config
+        with metrics.time("nginx_parse"):
+            routes = get_nginx_routes()
     except Exception as e:
         logger.error(f"Failed to reload nginx config: {e}")
+        return False
 
-def get_nginx_config() -> Dict[int, List[str]]:
-    with _lock:
-        return _nginx_config
+    return route_index.set_nginx_routes(routes)
+
+
+# Watchdog also reports files being opened and closed without a write, e.g. by Plato's own parse
+WRITE_EVENTS = {EVENT_TYPE_CREATED, EVENT_TYPE_MODIFIED, EVENT_TYPE_DELETED, EVENT_TYPE_MOVED, EVENT_TYPE_CLOSED}
 
 
 class NginxConfigWatcher(FileSystemEventHandler):
+    def __init__(self, on_change):
+        self._on_change = on_change
+
     def on_any_event(self, event):
-        if event.is_directory:
+        if event.is_directory or event.event_type not in WRITE_EVENTS:
             return
-        path = Path(event.src_path)
-        if path == NGINX_CONFIG_PATH or path.parent == SITES_ENABLED_DIR:
-            now = time.time()
-            if now - _latest_nginx_reload > _nginx_cooldown:
+        for path in (Path(event.src_path), Path(getattr(event, "dest_path", "") or event.src_path)):
+            if path == NGINX_CONFIG_PATH or path.parent == SITES_ENABLED_DIR:
                 logger.info(f"Detected change in Nginx config: {path}")
-                _reload_nginx_config()
+                self._on_change()
+                return
 
-def start_nginx_watcher():
+async def watch_nginx_config(on_change):
+    """
+    Reload the nginx config once its files have been quiet for a while.
 
-    _reload_nginx_config()
+    A burst of writes always ends with a reload that sees all of them, and
+    parsing runs off the event loop. on_change is called when the routes
+    changed.
+    """
+    loop = asyncio.get_running_loop()
+    changed = asyncio.Event()
 
-    event_handler = NginxConfigWatcher()
+    if await asyncio.to_thread(_reload_nginx_config):
+        on_change()
+
+    event_handler = NginxConfigWatcher(lambda: loop.call_soon_threadsafe(changed.set))
     observer = Observer()
     if NGINX_CONFIG_PATH.parent.exists():
         observer.schedule(event_handler, str(NGINX_CONFIG_PATH.parent), recursive=False)
     if SITES_ENABLED_DIR.exists():
         observer.schedule(event_handler, str(SITES_ENABLED_DIR), recursive=True)
 
+    observer.daemon = True
+    observer.start()
+
+    try:
+        while True:
+            await changed.wait()
+
+            # Wait for a quiet window, changes after this point trigger another reload
+            while True:
+                changed.clear()
+                try:
+                    await asyncio.wait_for(changed.wait(), _nginx_quiet_window)
+                except TimeoutError:
+                    break
+
+            if await asyncio.to_thread(_reload_nginx_config):
+                logger.info("Nginx routes changed")
+                on_change()
+    finally:
+        observer.stop()
+
+# ===================================================
+#                  ROUTE INDEX
+# ===================================================
+
+_caddy_label = re.compile(r"^caddy(_\d+)?$")
+_caddy_upstream_port = re.compile(r"upstreams\s+(?:https?\s+)?(\d+)")
+_traefik_router_rule = re.compile(r"^traefik\.http\.routers\.([^.]+)\.rule$")
+_traefik_service_port = re.compile(r"^traefik\.http\.services\.([^.]+)\.loadbalancer\.server\.port$")
+_traefik_hosts = re.compile(r"Host\(([^)]*)\)")
+_traefik_path_prefix = re.compile(r"PathPrefix\(\s*`([^`]*)`")
+
+# Addresses a proxy on the Docker host reaches published ports on
+HOST_ADDRESSES = ("127.0.0.1", "localhost", "0.0.0.0", "host.docker.internal")
+
+
+def label_routes(labels: Dict[str, str]) -> List[Tuple[Optional[int], str]]:
+    """(container port, URL) of the routes declared by caddy-docker-proxy and Traefik labels"""
+    routes = []
+
+    for key in sorted(labels):
+        if not _caddy_label.match(key):
+            continue
+        match = _caddy_upstream_port.search(labels.get(f"{key}.reverse_proxy", ""))
+        port = int(match.group(1)) if match else None
+        for address in re.split(r"[\s,]+", labels[key].strip()):
+            if address:
+                routes.append((port, address if "://" in address else f"https://{address}"))
+
+    if labels.get("traefik.enable", "true").lower() == "false":
+        return routes
+
+    service_ports: Dict[str, int] = {}
+    for key, value in labels.items():
+        match = _traefik_service_port.match(key)
+        if match and value.isdigit():
+            service_ports[match.group(1)] = int(value)
+
+    for key in sorted(labels):
+        match = _traefik_router_rule.match(key)
+        if not match:
+            continue
+        router = f"traefik.http.routers.{match.group(1)}"
+        rule = labels[key]
+
+        hosts = [host for group in _traefik_hosts.findall(rule) for host in re.findall(r"`([^`]*)`", group)]
+        path_prefix = _traefik_path_prefix.search(rule)
+        path = path_prefix.group(1).rstrip("/") if path_prefix else ""
+
+        tls = (
+            labels.get(f"{router}.tls", "").lower() == "true"
+            or f"{router}.tls.certresolver" in labels
+            or any(entrypoint in labels.get(f"{router}.entrypoints", "") for entrypoint in ("websecure", "https"))
+        )
+
+        service = labels.get(f"{router}.service")
+        if service:
+            port = service_ports.get(service)
+        else:
+            # Traefik links a router without service to the only service of the container
+            port = next(iter(service_ports.values())) if len(service_ports) == 1 else None
+
+        for host in hosts:
+            routes.append((port, f"{'https' if tls else 'http'}://{host}{path}"))
+
+    return routes
+
+
+class RouteIndex:
+    """
+    External URLs of the services, from every reverse proxy Plato knows.
+
+    Nginx routes are keyed by the (address, port, path) they proxy to and
+    replaced when the nginx config is reloaded. Caddy and Traefik routes
+    are declared on the containers themselves, so they are parsed per
+    container and only again when its labels change. Looking a container
+    up is a handful of dict probes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nginx: Dict[RouteKey, List[str]] = {}
+        # Port -> address -> URLs of the routes to the root path, for port only matches
+        self._nginx_ports: Dict[int, Dict[str, List[str]]] = {}
+        # Container ID -> (labels, label routes)
+        self._labels: Dict[str, Tuple[Dict[str, str], List[Tuple[Optional[int], str]]]] = {}
+        # Names and aliases of the containers on the dashboard
+        self._container_names: Set[str] = set()
+
+    def set_nginx_routes(self, routes: Dict[RouteKey, List[str]]) -> bool:
+        """Replace the nginx routes; returns whether they changed"""
+        ports: Dict[int, Dict[str, List[str]]] = {}
+        for (address, port, path), urls in routes.items():
+            if path == "/":
+                ports.setdefault(port, {})[address] = urls
+
+        with self._lock:
+            changed = routes != self._nginx
+            self._nginx = routes
+            self._nginx_ports = ports
+        return changed
+
+    def nginx_routes(self) -> Dict[RouteKey, List[str]]:
+        with self._lock:
+            return self._nginx
+
+    def container_urls(self, record: ContainerRecord, port: Optional[int] = None) -> List[str]:
+        """URLs declared by the labels of a container, preferring the routes to port"""
+        with self._lock:
+            cached = self._labels.get(record.id)
+            if cached is None or cached[0] != record.labels:
+                cached = (record.labels, label_routes(record.labels))
+                self._labels[record.id] = cached
+        routes = cached[1]
+
+        if port is not None:
+            ports = {internal for internal, external in record.ports if external == port} | {port}
+            matching = [url for route_port, url in routes if route_port in ports]
+            if matching:
+                return matching
+        return [url for _, url in routes]
+
+    def proxy_urls(self, record: ContainerRecord, hostname: str, port: int, endpoint: Optional[str] = None) -> List[str]:
+        """URLs of the nginx routes to a container published on hostname:port"""
+        # Containers are reached by name or alias on their port, the host on the published one
+        internal_ports = [internal for internal, external in record.ports if external == port] or [port]
+        hostname = hostname.lower()
+        addresses = [(name, internal) for name in (record.name, *sorted(record.aliases)) for internal in internal_ports]
+        addresses += [(address, port) for address in (hostname, hostname.split(".")[0], *HOST_ADDRESSES)]
+        paths = [normalize_route_path(endpoint), "/"] if endpoint else ["/"]
+
+        with self._lock:
+            for path in paths:
+                for address, address_port in addresses:
+                    urls = self._nginx.get((address, address_port, path))
+                    if urls:
+                        return urls
+
+            by_address = self._nginx_ports.get(port, {})
+            # The host under a domain, e.g. kiwi.lan for kiwi
+            short_name = hostname.split(".")[0]
+            for address, urls in by_address.items():
+                if address.split(".")[0] == short_name:
+                    return urls
+
+            # Port only match, skipping the routes to the other containers on the dashboard
+            others = self._container_names - {record.name, *record.aliases}
+            candidates = sorted(
+                (address, urls)
+                for candidate_port in dict.fromkeys([*internal_ports, port])
+                for address, urls in self._nginx_ports.get(candidate_port, {}).items()
+                if address not in others
+            )
+            if candidates:
+                if len(candidates) > 1:
+                    logger.debug("Several nginx routes on port %s for %s, using %s", port, record.name, candidates[0][0])
+                return candidates[0][1]
+        return []
+
+    def prune(self, records: List[ContainerRecord]):
+        """Forget the label routes of containers no longer shown, and learn the names of the others"""
+        ids = {record.id for record in records}
+        names = {name for record in records for name in (record.name, *record.aliases)}
+        with self._lock:
+            for cid in self._labels.keys() - ids:
+                del self._labels[cid]
+            self._container_names = names
+
+
+route_index = RouteIndex()
+
+# ===================================================
+#                  ICONS
+# ===================================================
+
+def normalize_icon_key(name: str) -> str:
+    return re.sub(r"[\s_]+", "-", name.strip().lower())
+
+
+def image_icon_key(image: str) -> str:
+    """lscr.io/linuxserver/jellyfin:latest -> jellyfin"""
+    image = image.split("@", 1)[0]
+    name = image.rsplit("/", 1)[-1]
+    return normalize_icon_key(name.split(":", 1)[0])
+
+
+def _scan_icons(folder: Path) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """Normalized name -> logo path, and logo path -> mtime of the PNG icons in folder"""
+    icons: Dict[str, str] = {}
+    mtimes: Dict[str, int] = {}
+    if not folder.exists():
+        return icons, mtimes
+
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(".png"):
+                # Paths are served relative to the www root
+                logo = str((folder / entry.name).relative_to(WWW_PATH))
+                icons[normalize_icon_key(entry.name[:-4])] = logo
+                mtimes[logo] = entry.stat().st_mtime_ns
+    return icons, mtimes
+
+
+class IconIndex:
+    """Normalized icon name -> logo path for the selfh.st and custom icons"""
+
+    def __init__(self):
+        self._selfhst: Dict[str, str] = {}
+        self._custom: Dict[str, str] = {}
+        self._selfhst_mtimes: Dict[str, int] = {}
+        self._custom_mtimes: Dict[str, int] = {}
+
+    def load(self):
+        self._selfhst, self._selfhst_mtimes = _scan_icons(SELFHST_ICONS)
+        self.reload_custom()
+        logger.info(f"Indexed {len(self._selfhst)} selfh.st and {len(self._custom)} custom icons")
+
+    def reload_custom(self) -> bool:
+        custom, mtimes = _scan_icons(CUSTOM_ICONS)
+        # A replaced icon keeps its name but needs a new optimized copy
+        changed = custom != self._custom or mtimes != self._custom_mtimes
+        # Swap whole dicts so lookups from other threads stay consistent
+        self._custom, self._custom_mtimes = custom, mtimes
+        return changed
+
+    def mtime(self, logo: str) -> Optional[int]:
+        """When an indexed icon last changed, None for logos outside the index"""
+        mtime = self._custom_mtimes.get(logo)
+        return mtime if mtime is not None else self._selfhst_mtimes.get(logo)
+
+    def lookup(self, name: str) -> Optional[str]:
+        key = normalize_icon_key(name)
+        return self._custom.get(key) or self._selfhst.get(key)
+
+    def lookup_image(self, image: str) -> Optional[str]:
+        if not image:
+            return None
+        return self.lookup(image_icon_key(image))
+
+
+icon_index = IconIndex()
+
+
+class CustomIconWatcher(FileSystemEventHandler):
+    def __init__(self, on_change):
+        self._on_change = on_change
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in WRITE_EVENTS:
+            return
+        if icon_index.reload_custom():
+            logger.info(f"Detected change in custom icons: {event.src_path}")
+            self._on_change()
+
+
+def start_icon_watcher(on_change):
+
+    icon_index.load()
+
+    observer = Observer()
+    if CUSTOM_ICONS.exists():
+        observer.schedule(CustomIconWatcher(on_change), str(CUSTOM_ICONS), recursive=False)
+
     observer.daemon = True
     observer.start()
     return observer
@@ -311,57 +2001,74 @@ KNOWN_PORTS = {
     "esphome": 6052
 }
 
-def get_local_url(container, name:str ) -> Tuple[str, int]:
+@lru_cache(maxsize=4096)
+def known_port(*names: str) -> Optional[int]:
+    """UI port of a well known service whose name appears in one of names"""
+    for service, port in KNOWN_PORTS.items():
+        if any(service in name for name in names):
+            logger.debug("Found known port for service %s: %s", service, port)
+            return port
+    return None
 
-    # Find used TCP ports
-    unique_ports = set()
-    for port_proto, host_mappings in container.attrs['NetworkSettings']['Ports'].items():
-        internal_port, proto = port_proto.split('/')
-        if proto == "tcp" and host_mappings:
-            for mapping in host_mappings:
-                unique_ports.add((int(internal_port), int(mapping['HostPort'])))
 
-    logger.debug(f"Ports found: {unique_ports}")
+def _protocol(port: int) -> str:
+    return "https" if port in COMMON_HTTPS_PORTS else "http"
+
+
+def get_local_url(record: ContainerRecord, name:str, hostname: str) -> Optional[Tuple[str, int]]:
+
+    unique_ports = record.ports
+
+    logger.debug("Ports found: %s", unique_ports)
 
     if len(unique_ports) == 1:
         # Use the only exposed port as UI port
         internal_port, external_port = next(iter(unique_ports))
 
-        protocol = "http"
-        if internal_port in COMMON_HTTPS_PORTS:
-            protocol = "https"
+        return f"{_protocol(internal_port)}://{hostname}:{external_port}", external_port
 
-        return f"{protocol}://{HOSTNAME}:{external_port}", external_port
-
-    elif len(unique_ports) > 1:
-        # Check if any of the found ports are common HTTP/HTTPS port
-        for internal_port, external_port in unique_ports:
+    service_port = known_port(record.image_title, record.image, record.name)
+    exposed_ports = record.exposed_ports or frozenset()
 
+    if len(unique_ports) > 1:
+        candidates = sorted(unique_ports)
+        # Published ports the image declares, telling the UI apart from ports added at run time
+        declared = exposed_ports & {internal for internal, _ in candidates}
 
-            protocol = None
+        for internal_port, external_port in candidates:
+            if internal_port == service_port or (len(declared) == 1 and internal_port in declared):
+                logger.debug("Found UI port %s -> %s", internal_port, external_port)
+                return f"{_protocol(internal_port)}://{hostname}:{external_port}", external_port
 
-            if internal_port in COMMON_HTTP_PORTS:
-                protocol = "http"
-            elif internal_port in COMMON_HTTPS_PORTS:
-                protocol = "https"
+        # Check if any of the found ports are common HTTP/HTTPS port
+        for internal_port, external_port in candidates:
+            if internal_port in COMMON_HTTP_PORTS or internal_port in COMMON_HTTPS_PORTS:
+                logger.debug("Found common port %s -> %s", internal_port, external_port)
+                return f"{_protocol(internal_port)}://{hostname}:{external_port}", external_port
 
-            if protocol is not None:
-                logger.debug(f"Found common {protocol} port {internal_port} -> {external_port}")
-                return f"{protocol}://{HOSTNAME}:{external_port}", external_port
+        if record.exposed_ports is None and record.image_id:
+            logger.warning(f"Image of {name} could not be read yet, leaving it out until it can")
+            return None
 
         logger.error(f"More than one UI port found for {name}\nDisanbiguation needed with plato.ui-port")
         exit(1)
 
 
     else:
-        # If no port is exposed, search known ports
-        image_name = container.image.tags[0] if container.image.tags else ""
-        container_name = container.name.lower()
+        # Nothing published, the container shares the host network or is proxied
+        exposed = sorted(exposed_ports)
+        if service_port is None:
+            if len(exposed) == 1:
+                service_port = exposed[0]
+            else:
+                service_port = next((port for port in exposed if port in COMMON_HTTP_PORTS or port in COMMON_HTTPS_PORTS), None)
+
+        if service_port is not None:
+            return f"{_protocol(service_port)}://{hostname}:{service_port}", service_port
 
-        for service, port in KNOWN_PORTS.items():
-            if service in image_name or service in container_name:
-                logger.debug(f"Found known port for service {service}: {port}")
-                return f"http://{HOSTNAME}:{port}", port
+        if record.exposed_ports is None and record.image_id:
+            logger.warning(f"Image of {name} could not be read yet, leaving it out until it can")
+            return None
 
         logger.error(f"No port found for {name}\nPort must be provided with plato.ui-port")
         exit(1)
@@ -370,27 +2077,127 @@ def get_local_url(container, name:str ) -> Tuple[str, int]:
 #                  GENERATE CONFIG
 # ===================================================
 
-def generate_homer_config():
+# libyaml's emitter when PyYAML was built with it
+YAML_DUMPER = getattr(yaml, "CDumper", yaml.Dumper)
+
+# Everything but the services only depends on the environment
+_rendered_header: Optional[str] = None
+# Services of each rendered file by file name, applied in place by the live updates
+_rendered_services: Dict[str, List[dict]] = {}
+
+
+def render_header() -> str:
+    """Render the static part of the configuration once"""
+    global _rendered_header
+
+    if _rendered_header is None:
+        header = {k: v for k, v in configuration.items() if k != 'services'}
+        if CONFIG_FORMAT == "json":
+            # Left open for the services
+            _rendered_header = json.dumps(header, indent=2)[:-2] + ',\n  "services": '
+        else:
+            _rendered_header = yaml.dump(header, Dumper=YAML_DUMPER, default_flow_style=False, sort_keys=False)
+    return _rendered_header
+
+
+def render_configuration(services: List[dict]) -> str:
+    if CONFIG_FORMAT == "json":
+        return render_header() + json.dumps(services, separators=(",", ":")) + "\n}\n"
+    return render_header() + yaml.dump({'services': services}, Dumper=YAML_DUMPER, default_flow_style=False, sort_keys=False)
+
+
+def render_document(document: dict) -> str:
+    if CONFIG_FORMAT == "json":
+        return json.dumps(document, separators=(",", ":")) + "\n"
+    return yaml.dump(document, Dumper=YAML_DUMPER, default_flow_style=False, sort_keys=False)
+
+
+def page_paths(pages: List[str]) -> Dict[str, Path]:
+    """
+    Page name -> file; Homer loads assets/<page>.yml for a #<page> link.
+
+    Names reduced to the same slug, like "Media & TV" and "Media TV", get
+    numbered in name order so neither page overwrites the other.
+    """
+    paths = {}
+    taken = set()
+    for page in sorted(pages):
+        slug = base = re.sub(r"[^a-z0-9]+", "-", page.lower()).strip("-")
+        suffix = 2
+        while slug in taken:
+            slug = f"{base}-{suffix}"
+            suffix += 1
+        if slug != base:
+            logger.warning(f"Page {page} has the same file name as another page, publishing it as page-{slug}.yml")
+        taken.add(slug)
+        paths[page] = ASSETS_PATH / f"page-{slug}.yml"
+    return paths
+
+
+def render_pages(services: List[dict]) -> Dict[Path, str]:
+    """
+    Render one page per group of categories and an index linking them.
+
+    Homer merges a page over config.yml when its link is followed, so the
+    pages only carry their services and each one is rewritten on its own.
+    """
+    global _rendered_services
+
+    grouped: Dict[str, List[dict]] = {}
+    for service in services:
+        grouped.setdefault(PAGE_GROUPS_DICT.get(service["name"], service["name"]), []).append(service)
+
+    paths = page_paths(list(grouped))
+    pages: Dict[Path, Tuple[str, List[dict]]] = {paths[page]: (page, groups) for page, groups in grouped.items()}
+
+    links = [
+        {k: v for k, v in {
+            "name": page,
+            "icon": CATEGORY_ICONS_DICT.get(page, groups[0].get("icon")),
+            "url": f"#{path.stem}",
+        }.items() if v is not None}
+        for path, (page, groups) in pages.items()
+    ]
+
+    index = {k: v for k, v in configuration.items() if k != 'services'}
+    index["links"] = links
+    index["services"] = [{"name": "Pages", "items": [dict(link) for link in links]}]
+
+    rendered = {CONFIG_PATH: render_document(index)}
+    for path, (page, groups) in pages.items():
+        rendered[path] = render_document({"subtitle": page, "services": groups})
+    # The index also carries the navbar links of every page, it is always refetched
+    _rendered_services = {path.name: groups for path, (page, groups) in pages.items()}
+    return rendered
+
+
+def render_homer_config() -> Dict[Path, str]:
     logger.info("🔧 Generating Homer dashboard configuration...")
 
-    nginx_url_pairs = get_nginx_config()
+    with metrics.time("regeneration"):
+        return _render_homer_config()
+
+def _render_homer_config() -> Dict[Path, str]:
+    global _probe_targets, _rendered_services
 
     categories = {}
 
-    for container in safe_list_containers():
+    # Per container stages are too short to time one by one
+    url_time = icon_time = 0.0
 
-        # skip stopped/paused containers
-        if container.status != "running":
-            continue
+    probe_targets: Dict[str, float] = {}
 
-        labels = container.labels
+    records = [record for host in docker_hosts for record in host.store.records()]
+    # Before resolving any URL, so port only nginx matches know the other containers
+    route_index.prune(records)
 
-        category = labels.get("plato.category")
+    for host, record in ((host, record) for host in docker_hosts for record in host.store.records()):
 
-        if not category:
-            continue
+        labels = record.labels
+
+        category = labels.get("plato.category")
 
-        container_name = container.name.lower()
+        container_name = record.name
 
 
         name        = labels.get("plato.name", container_name.title())
@@ -400,38 +2207,62 @@ def generate_homer_config():
 
         force_https = labels.get("plato.force-https", "false").lower() in ("1", "true", "yes")
 
-        logger.debug(f"> Processing container {name}")
+        logger.debug("> Processing container %s", name)
 
-        # caddy-docker-proxy support
-        caddy_url = labels.get("caddy")
-        if caddy_url:
-            logger.debug(f"Caddy found: {caddy_url}")
-            url = "https://" + caddy_url
+        start = time.perf_counter()
+
+        if ui_port:
+            try:
+                ui_port = int(ui_port)
+            except ValueError:
+                logger.error(f"plato.ui-port must be a port number for {name}")
+                exit(1)
+
+        # caddy-docker-proxy and Traefik labels
+        if not url:
+            label_urls = route_index.container_urls(record, ui_port)
+            if label_urls:
+                url = label_urls[0]
+                logger.debug("Found proxy label url: %s", url)
 
         if not url:
             if ui_port:
-                url = f"http://{HOSTNAME}:{ui_port}"
+                url = f"http://{host.hostname}:{ui_port}"
             else:
-                url, ui_port = get_local_url(container, name)
+                local_url = get_local_url(record, name, host.hostname)
+                if local_url is None:
+                    continue
+                url, ui_port = local_url
 
             if endpoint:
                 url = urljoin(url.rstrip('/') + '/', endpoint)
 
-            if nginx_url_pairs:
-                external_urls = nginx_url_pairs.get(ui_port)
-                if external_urls:
-                    url = external_urls[0]
-                    logger.debug(f"Found external url: {url}")
+            external_urls = route_index.proxy_urls(record, host.hostname, ui_port, endpoint)
+            if external_urls:
+                url = external_urls[0]
+                logger.debug("Found external url: %s", url)
 
         if url and force_https:
             if "https" not in url:
-                logger.debug(f"Force HTTPS on {url}")
+                logger.debug("Force HTTPS on %s", url)
                 url = url.replace("http", "https")
 
         if not url:
             logger.error(f"Could not create URL for {name}")
             exit(1)
 
+        url_time += time.perf_counter() - start
+
+        if PROBE_SERVICES:
+            try:
+                probe_interval = float(labels.get("plato.probe-interval", PROBE_INTERVAL))
+            except ValueError:
+                logger.error(f"plato.probe-interval must be a number of seconds for {name}")
+                exit(1)
+            if probe_interval > 0 and url.startswith(("http://", "https://")):
+                # Tiles sharing a URL are probed once, as often as the most eager one asks
+                probe_targets[url] = min(probe_interval, probe_targets.get(url, probe_interval))
+
         try:
             position = int(labels.get("plato.position", 99))
         except (TypeError, ValueError):
@@ -455,35 +2286,39 @@ def generate_homer_config():
 
         custom_logo = labels.get("plato.custom-logo")
 
+        start = time.perf_counter()
+
         if custom_logo:
             result['logo'] = custom_logo
 
         elif AUTOMATIC_ICONS:
-            search_icon = container_name
-
             selfhst_icon = labels.get("plato.selfhst-icon")
 
             if selfhst_icon:
-                search_icon = selfhst_icon
-
-            selfhst_icon_path = SELFHST_ICONS / f"{search_icon.replace("_","-").replace(" ","-")}.png"
-
-            custom_icon_path = CUSTOM_ICONS / f"{search_icon}.png"
+                logo = icon_index.lookup(selfhst_icon)
+                if not logo:
+                    logger.error(f"Provided logo is invalid: plato.selfhst-icon={selfhst_icon}")
+                    exit(1)
+            else:
+                logo = icon_index.lookup(container_name) or icon_index.lookup_image(record.image)
 
-            if os.path.exists(custom_icon_path):
-                result['logo'] = str(Path(*custom_icon_path.parts[2:]))
-                logger.debug(f"Found Custom icon: {search_icon}")
-            elif os.path.exists(selfhst_icon_path):
-                result['logo'] = str(Path(*selfhst_icon_path.parts[2:]))
-                logger.debug(f"Found selfh.st icon: {search_icon}.png")
+            if logo:
+                result['logo'] = logo
+                logger.debug("Found icon for %s: %s", name, logo)
             else:
-                logger.warning(f"Icon not found for {name}: {search_icon}.png")
-                if selfhst_icon:
-                    logger.error("Provided logo is invalid: plato.selfhst-icon")
-                    exit(1)
+                logger.warning(f"Icon not found for {name}: {container_name}.png")
+
+        icon_time += time.perf_counter() - start
 
         categories.setdefault(category, []).append(result)
 
+    _probe_targets = probe_targets
+    image_cache.prune({record.image_id for record in records})
+
+    # URL resolution includes the nginx lookup
+    metrics.observe("plato_stage_duration_seconds", url_time, stage="url_resolution")
+    metrics.observe("plato_stage_duration_seconds", icon_time, stage="icon_resolution")
+
     # Sort each column
     for category in categories:
         categories[category].sort(key=lambda x: (x["position"], x["name"]))
@@ -503,10 +2338,568 @@ def generate_homer_config():
             else len(CATEGORY_ICONS_DICT)
     )
 
-    logger.debug(yaml.dump(configuration, sort_keys=False, default_flow_style=False))
+    if OPTIMIZE_ICONS:
+        with metrics.time("icon_optimization"):
+            optimize_logos(configuration['services'])
+
+    with metrics.time("yaml_render"):
+        if SPLIT_PAGES:
+            rendered = render_pages(configuration['services'])
+        else:
+            rendered = {CONFIG_PATH: render_configuration(configuration['services'])}
+            _rendered_services = {CONFIG_PATH.name: configuration['services']}
+
+    for path, text in rendered.items():
+        logger.debug("%s:\n%s", path.name, text)
+
+    return rendered
+
+def generate_homer_config():
+    publish_config(render_homer_config())
+    remove_unused_icons(_rendered_icons)
+
+# ===================================================
+#                  HEALTH PROBES
+# ===================================================
+
+# URL -> probe interval of the services on the dashboard, replaced on each regeneration
+_probe_targets: Dict[str, float] = {}
+
+# Probes only check that something answers, self-signed certificates are fine
+_probe_ssl_context = ssl.create_default_context()
+_probe_ssl_context.check_hostname = False
+_probe_ssl_context.verify_mode = ssl.CERT_NONE
+
+
+async def probe_url(url: str, timeout: float = PROBE_TIMEOUT) -> dict:
+    """GET url and report it online unless it fails, times out or answers with a 5xx"""
+    parts = urlsplit(url)
+    https = parts.scheme == "https"
+    path = parts.path or "/"
+    if parts.query:
+        path += f"?{parts.query}"
 
-    with open(ASSETS_PATH / Path("config.yml"), "w") as f:
-        yaml.dump(configuration, f, default_flow_style=False, sort_keys=False)
+    start = time.perf_counter()
+    code = None
+    try:
+        async with asyncio.timeout(timeout):
+            reader, writer = await asyncio.open_connection(
+                parts.hostname, parts.port or (443 if https else 80),
+                ssl=_probe_ssl_context if https else None,
+            )
+            try:
+                writer.write(
+                    f"GET {path} HTTP/1.1\r\nHost: {parts.netloc.rsplit('@', 1)[-1]}\r\n"
+                    "User-Agent: Plato\r\nConnection: close\r\n\r\n".encode()
+                )
+                await writer.drain()
+                status_line = await reader.readline()
+            finally:
+                writer.close()
+        code = int(status_line.split()[1])
+        status = "online" if code < 500 else "offline"
+    except (OSError, TimeoutError, ValueError, IndexError):
+        status = "offline"
+
+    return {
+        "status": status,
+        "code": code,
+        "latency_ms": round((time.perf_counter() - start) * 1000),
+        "checked": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+class ServiceProber:
+    """
+    Probes the services on the dashboard and publishes their status.
+
+    Each URL is probed on its own interval with at most concurrency probes
+    in flight. Results are cached and status.json is only rewritten when a
+    service changes status or joins/leaves the dashboard.
+    """
+
+    def __init__(self, timeout=PROBE_TIMEOUT, concurrency=PROBE_CONCURRENCY, path=STATUS_PATH):
+        self._timeout = timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._path = path
+        self._results: Dict[str, dict] = {}
+        self._next_check: Dict[str, float] = {}
+
+    async def _probe(self, url: str) -> dict:
+        async with self._semaphore:
+            return await probe_url(url, self._timeout)
+
+    def results(self) -> Dict[str, dict]:
+        return dict(self._results)
+
+    async def probe_due(self, targets: Dict[str, float]) -> bool:
+        """Probe the targets whose interval elapsed; returns whether any status changed"""
+        loop = asyncio.get_running_loop()
+
+        changed = False
+        for url in set(self._results) - targets.keys():
+            del self._results[url]
+            self._next_check.pop(url, None)
+            changed = True
+
+        now = loop.time()
+        due = [url for url, interval in targets.items() if self._next_check.get(url, 0) <= now]
+        if not due:
+            return changed
+
+        for url, result in zip(due, await asyncio.gather(*(self._probe(url) for url in due))):
+            previous = self._results.get(url)
+            if previous is None or previous["status"] != result["status"]:
+                logger.debug("Service %s is %s", url, result["status"])
+                changed = True
+            self._results[url] = result
+            self._next_check[url] = loop.time() + targets[url]
+
+        return changed
+
+    async def run(self):
+        while True:
+            if await self.probe_due(_probe_targets):
+                status = {
+                    "updated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "services": self.results(),
+                }
+                # Polled by the dashboard and small, served uncompressed
+                await asyncio.to_thread(atomic_write, self._path, json.dumps(status, indent=2))
+                if LIVE_UPDATES:
+                    live_updates.notify_status()
+
+            await asyncio.sleep(1)
+
+# ===================================================
+#                  LIVE UPDATES
+# ===================================================
+
+LIVE_SCRIPT_PATH = ASSETS_PATH / Path("plato-live.js")
+LIVE_SCRIPT_TAG = '<script src="assets/plato-live.js" defer></script>'
+INDEX_PATH = WWW_PATH / Path("index.html")
+
+# Seconds between comments that keep idle streams from being closed by proxies
+LIVE_HEARTBEAT = 30
+# Messages buffered per client before it is told to refresh everything instead
+LIVE_CLIENT_QUEUE = 16
+
+# Categories are swapped into the services of Homer's root Vue component. When
+# that is not possible, Homer rebuilds the dashboard on hashchange, which refetches
+# config.yml and the open page without reloading the document or its icons
+LIVE_SCRIPT = """\
+// Updates the dashboard in place when Plato publishes a new configuration,
+// and marks the tiles with the status of the services probed by Plato
+(function () {
+  if (!window.EventSource) return;
+  var statuses = {};
+  var marking = false;
+
+  var style = document.createElement("style");
+  style.textContent =
+    "[data-plato-status]{position:relative}" +
+    "[data-plato-status]::after{content:'';position:absolute;top:.5em;right:.5em;width:.6em;height:.6em;border-radius:50%}" +
+    "[data-plato-status=online]::after{background:#94e185}" +
+    "[data-plato-status=offline]::after{background:#c9404d}";
+  document.head.appendChild(style);
+
+  function mark() {
+    marking = false;
+    var links = document.querySelectorAll("a[href]");
+    for (var i = 0; i < links.length; i++) {
+      var result = statuses[links[i].getAttribute("href")];
+      var tile = links[i].closest(".card") || links[i];
+      if (!result) {
+        if (tile.hasAttribute("data-plato-status")) tile.removeAttribute("data-plato-status");
+      } else if (tile.getAttribute("data-plato-status") !== result.status) {
+        tile.setAttribute("data-plato-status", result.status);
+      }
+    }
+  }
+
+  // Homer replaces the tiles when it rebuilds the dashboard
+  new MutationObserver(function () {
+    if (!marking) {
+      marking = true;
+      requestAnimationFrame(mark);
+    }
+  }).observe(document.body, { childList: true, subtree: true });
+
+  function loadStatus() {
+    fetch("assets/status.json", { cache: "no-cache" })
+      .then(function (response) { return response.ok ? response.json() : {}; })
+      .then(function (status) { statuses = status.services || {}; mark(); })
+      .catch(function () {});
+  }
+
+  function rebuild() {
+    if (typeof window.onhashchange === "function") window.onhashchange();
+    else location.reload();
+  }
+
+  // Homer's root component, holding the loaded config and the services shown
+  function homer() {
+    var app = document.getElementById("app");
+    var root = app && app._vnode && app._vnode.component && app._vnode.component.proxy;
+    return root && root.config && Array.isArray(root.config.services) && "services" in root ? root : null;
+  }
+
+  function apply(diff) {
+    var vm = homer();
+    if (!vm) return false;
+    var groups = {};
+    vm.config.services.forEach(function (group) { groups[group.name] = group; });
+    var services = [];
+    for (var i = 0; i < diff.order.length; i++) {
+      var name = diff.order[i];
+      var group = diff.changed[name] || groups[name];
+      if (!group) return false;
+      services.push(group);
+    }
+    vm.config.services = services;
+    if (vm.filter && typeof vm.filterServices === "function") vm.filterServices(vm.filter);
+    else vm.services = services;
+    return true;
+  }
+
+  var opened = false;
+  var source = new EventSource("plato/events");
+  source.addEventListener("open", function () {
+    // Catch up with a publish made while the page was loading, later ones are streamed
+    if (!opened) rebuild();
+    opened = true;
+  });
+  source.addEventListener("status", loadStatus);
+  source.addEventListener("config", function (event) {
+    var update = JSON.parse(event.data);
+    var page = location.hash ? location.hash.substring(1) + ".yml" : "config.yml";
+    var diffs = update.categories || {};
+    function stale(file) { return update.files.indexOf(file) >= 0 && !diffs[file]; }
+    if (!update.files) {
+      // A full refresh may have missed status changes too
+      loadStatus();
+      rebuild();
+    } else if (stale("config.yml") || stale(page)) {
+      rebuild();
+    } else if (diffs[page] && !apply(diffs[page])) {
+      rebuild();
+    }
+    // Other pages are refetched when they are opened
+  });
+  loadStatus();
+})();
+"""
+
+
+def category_digests(services: List[dict]) -> Dict[str, str]:
+    """Category name -> hash of its rendered column"""
+    return {
+        group["name"]: hashlib.sha256(json.dumps(group, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        for group in services
+    }
+
+
+class LiveUpdates:
+    """
+    Pushes each published config change to the open dashboards.
+
+    Every client of the Server-Sent Events stream gets the version of the
+    published files and the files that were rewritten. For each rewritten
+    file whose previous categories are known, it also gets the order of
+    the categories and the content of the ones that changed or appeared,
+    which the dashboard applies in place. Other rewritten files are
+    refetched. A client that falls behind or reconnects after missing a
+    version is sent a full refresh, which names no files. Clients are also
+    told when status.json changes.
+    """
+
+    def __init__(self):
+        self._clients: Set[asyncio.Queue] = set()
+        # File name -> category name -> digest, as last published
+        self._categories: Dict[str, Dict[str, str]] = {}
+        self.version: Optional[str] = None
+
+    def notify(self, files: List[Path], services: Dict[str, List[dict]]):
+        """Announce a publish; must be called from the event loop"""
+        self.version = hashlib.sha256(
+            "".join(sorted((_published_hashes or {}).values())).encode("utf-8")
+        ).hexdigest()[:16]
+
+        names = [path.name for path in files]
+        digests = {name: category_digests(groups) for name, groups in services.items()}
+        diff = {}
+        for name in names:
+            before = self._categories.get(name)
+            # Dashboards may show what a previous run published
+            if name not in services or before is None:
+                continue
+            diff[name] = {
+                "order": [group["name"] for group in services[name]],
+                "changed": {
+                    group["name"]: group for group in services[name]
+                    if before.get(group["name"]) != digests[name][group["name"]]
+                },
+            }
+        self._categories = digests
+
+        message = self._message(diff, names)
+        for queue in self._clients:
+            self._send(queue, message)
+
+    def notify_status(self):
+        """Tell the clients that status.json changed; must be called from the event loop"""
+        for queue in self._clients:
+            self._send(queue, b"event: status\ndata: {}\n\n")
+
+    def _send(self, queue: asyncio.Queue, message: bytes):
+        if queue.full():
+            # The messages it missed cannot be merged, it reloads everything instead
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(self._message(None, None))
+        else:
+            queue.put_nowait(message)
+
+    def _message(self, categories: Optional[dict], files: Optional[List[str]]) -> bytes:
+        data = json.dumps({"version": self.version, "categories": categories, "files": files}, separators=(",", ":"))
+        return f"id: {self.version}\nevent: config\ndata: {data}\n\n".encode()
+
+    async def stream(self, writer: asyncio.StreamWriter, last_version: Optional[str]):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_CLIENT_QUEUE)
+        self._clients.add(queue)
+        metrics.set("plato_live_clients", len(self._clients))
+
+        try:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                b"Cache-Control: no-cache\r\nX-Accel-Buffering: no\r\nConnection: close\r\n\r\n"
+                b"retry: 5000\n\n"
+            )
+            # Reconnected after missing a publish
+            if last_version and self.version and last_version != self.version:
+                writer.write(self._message(None, None))
+            await writer.drain()
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), LIVE_HEARTBEAT)
+                except TimeoutError:
+                    message = b": ping\n\n"
+                writer.write(message)
+                await writer.drain()
+        finally:
+            self._clients.discard(queue)
+            metrics.set("plato_live_clients", len(self._clients))
+
+
+live_updates = LiveUpdates()
+
+
+async def _serve_live_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await reader.readline()
+        headers = {}
+        while (line := (await reader.readline()).strip()):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        parts = request_line.decode("latin-1").split()
+        # lighttpd forwards the path under SUBFOLDER unchanged
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0].endswith("/plato/events"):
+            await live_updates.stream(writer, headers.get("last-event-id"))
+        else:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\nContent-Length: 10\r\nConnection: close\r\n\r\nNot Found\n")
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_live_updates(port: int):
+    # Only lighttpd connects, through its proxy
+    server = await asyncio.start_server(_serve_live_request, host="127.0.0.1", port=port)
+    logger.info(f"Serving live updates on port {port}")
+    async with server:
+        await server.serve_forever()
+
+
+def install_live_script():
+    """Publish the live update script and add it to Homer's index.html, or take it out when disabled"""
+    try:
+        html = original = INDEX_PATH.read_text()
+    except OSError as e:
+        if LIVE_UPDATES:
+            logger.warning(f"Could not read {INDEX_PATH}, dashboards will not update live: {e}")
+        return
+
+    if LIVE_UPDATES:
+        atomic_write(LIVE_SCRIPT_PATH, LIVE_SCRIPT)
+        if LIVE_SCRIPT_TAG not in html:
+            html = html.replace("</head>", f"{LIVE_SCRIPT_TAG}</head>", 1)
+    else:
+        html = html.replace(LIVE_SCRIPT_TAG, "")
+
+    if html != original:
+        atomic_write(INDEX_PATH, html)
+        logger.info(f"Live updates {'enabled' if LIVE_UPDATES else 'disabled'} in {INDEX_PATH}")
+
+# ===================================================
+#                  SNAPSHOT
+# ===================================================
+
+SNAPSHOT_VERSION = 5
+
+
+def save_snapshot(path: Path):
+    """Persist the container records and nginx port map the dashboard is built from"""
+    # Read before the records, so events applied in between are replayed rather than missed
+    last_events = {host.hostname: host.last_event for host in docker_hosts}
+
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "events": last_events,
+        "hosts": {
+            host.hostname: [
+                [
+                    record.id, record.name, record.image, record.labels, sorted(record.ports), record.image_id,
+                    None if record.exposed_ports is None else sorted(record.exposed_ports), record.image_title,
+                    sorted(record.aliases),
+                ]
+                for record in host.store.records()
+            ]
+            for host in docker_hosts
+        },
+        "nginx": [[address, port, path, urls] for (address, port, path), urls in route_index.nginx_routes().items()],
+    }
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, json.dumps(snapshot, separators=(",", ":")))
+    except OSError as e:
+        logger.warning(f"Could not save state snapshot: {e}")
+
+
+def load_snapshot(path: Path) -> bool:
+    """Restore the state saved by save_snapshot(); returns whether it was loaded"""
+    try:
+        snapshot = json.loads(path.read_bytes())
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable state snapshot: {e}")
+        return False
+
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.warning("Ignoring state snapshot from another version")
+        return False
+
+    for host in docker_hosts:
+        host.store.replace([
+            ContainerRecord(
+                cid, name, image, labels, frozenset(tuple(port) for port in ports), image_id,
+                None if exposed_ports is None else frozenset(exposed_ports), image_title, frozenset(aliases),
+            )
+            for cid, name, image, labels, ports, image_id, exposed_ports, image_title, aliases in snapshot["hosts"].get(host.hostname, [])
+        ])
+        # Resume the event stream where the snapshot was taken
+        host.last_event = snapshot.get("events", {}).get(host.hostname)
+
+    route_index.set_nginx_routes({(address, port, path): urls for address, port, path, urls in snapshot["nginx"]})
+
+    return True
+
+# ===================================================
+#                  RUNTIME
+# ===================================================
+
+async def run_plato():
+    global event_journal
+
+    loop = asyncio.get_running_loop()
+    scheduler = RegenerationScheduler()
+
+    # Cancel everything cleanly on shutdown
+    main_task = asyncio.current_task()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, main_task.cancel)
+
+    icon_observer = start_icon_watcher(scheduler.request_threadsafe(loop))
+
+    if RECORD_EVENTS:
+        event_journal = EventJournal(Path(RECORD_EVENTS), [host.hostname for host in docker_hosts])
+        logger.info(f"Recording Docker events to {RECORD_EVENTS}")
+
+    # Serve the last known dashboard while the live state is being reconciled
+    if STATE_PATH and load_snapshot(Path(STATE_PATH)):
+        await asyncio.to_thread(generate_homer_config)
+        logger.info(f"Warm started from {STATE_PATH}")
+
+    try:
+        async with asyncio.TaskGroup() as tasks:
+            tasks.create_task(scheduler.regenerate())
+            tasks.create_task(scheduler.publish())
+            tasks.create_task(watch_nginx_config(scheduler.request))
+            for host in docker_hosts:
+                tasks.create_task(host.watch(scheduler.request))
+            if METRICS_PORT:
+                tasks.create_task(serve_metrics(int(METRICS_PORT)))
+            if PROBE_SERVICES:
+                tasks.create_task(ServiceProber().run())
+            if LIVE_UPDATES:
+                tasks.create_task(serve_live_updates(LIVE_PORT))
+    except asyncio.CancelledError:
+        logger.info("Shutting down")
+    finally:
+        icon_observer.stop()
+        if event_journal:
+            event_journal.close()
+
+
+async def replay_plato(path: Path, speed: float):
+    """Feed a recorded journal through the pipeline without a Docker daemon, then report"""
+    global docker_hosts, STATE_PATH
+
+    # Start from the recording, not from the last snapshot
+    STATE_PATH = ""
+
+    hostnames, entries = load_journal(path)
+    docker_hosts = [DockerHost(hostname) for hostname in hostnames]
+    # Routes come from the local nginx config, they are not journaled
+    await asyncio.to_thread(_reload_nginx_config)
+
+    logger.info(f"Replaying {path} at {speed or 'max'}x speed")
+    scheduler = RegenerationScheduler()
+    start = time.monotonic()
+    for host in docker_hosts:
+        host.client = replay_client(entries.get(host.hostname, []), speed, start)
+
+    async with asyncio.TaskGroup() as tasks:
+        workers = [tasks.create_task(scheduler.regenerate()), tasks.create_task(scheduler.publish())]
+        await asyncio.gather(*(host.watch(scheduler.request, reconnect=False) for host in docker_hosts))
+        replayed = time.monotonic()
+        await scheduler.drain()
+        finished = time.monotonic()
+        for worker in workers:
+            worker.cancel()
+
+    report = {
+        "journal": str(path),
+        "speed": speed,
+        "events": sum(host.client.event_count for host in docker_hosts),
+        "recorded_s": max((host.client.last_event for host in docker_hosts), default=0.0),
+        "replay_s": round(replayed - start, 4),
+        # From the last event being applied to its config being published
+        "drain_s": round(finished - replayed, 4),
+        "publishes": dict(publish_stats),
+        "stages": {
+            stage: {"count": count, "total_s": round(total, 4)}
+            for stage, (count, total) in sorted(metrics.totals("plato_stage_duration_seconds", "stage").items())
+        },
+        # Hashes to compare the final config of two replays
+        "config": {str(path): digest for path, digest in sorted((_published_hashes or {}).items())},
+    }
+    print(json.dumps(report, indent=2))
 
 if __name__ == "__main__":
     logger.info("""
@@ -525,10 +2918,15 @@ if __name__ == "__main__":
          `------'
 """)
     # Validate initial config
-    if not HOSTNAME:
+    if not HOSTNAME and not DOCKER_HOSTS and not REPLAY_EVENTS:
         logger.error("HOSTNAME must be provided")
         exit(1)
 
+    docker_hosts = parse_docker_hosts(DOCKER_HOSTS)
+    if not docker_hosts:
+        logger.error("DOCKER_HOSTS must be a list of hostname=endpoint pairs")
+        exit(1)
+
     if CATEGORY_ICONS:
         CATEGORY_ICONS_DICT = dict(
             (k.strip(), v.strip())
@@ -537,18 +2935,23 @@ if __name__ == "__main__":
     else:
         logger.warning("CATEGORY_ICONS not provided. Column order will be random")
 
-    write_manifest()
-
-    start_nginx_watcher()
+    if PAGE_GROUPS:
+        PAGE_GROUPS_DICT = dict(
+            (k.strip(), v.strip())
+            for k, v in (item.split("=", 1) for item in PAGE_GROUPS.split(",") if "=" in item)
+        )
 
-    generate_homer_config()
+    if PROBE_SERVICES and not LIVE_UPDATES:
+        logger.warning("PROBE_SERVICES is enabled without LIVE_UPDATES, assets/status.json is published but the dashboard does not show it")
 
-    for event in client.events(decode=True, filters={"type": "container"}):
-         # Skip exec-related events
-        action = event["Action"]
-        if action.startswith("exec_"):
-            continue
+    if REPLAY_EVENTS:
+        # Replays usually write to a scratch WWW_PATH
+        ASSETS_PATH.mkdir(parents=True, exist_ok=True)
 
-        logger.debug(f"Container event: {event["Action"]} on {event["Actor"]["Attributes"].get("name")}")
+    write_manifest()
 
-        generate_homer_config()
+    if REPLAY_EVENTS:
+        asyncio.run(replay_plato(Path(REPLAY_EVENTS), REPLAY_SPEED))
+    else:
+        install_live_script()
+        asyncio.run(run_plato())